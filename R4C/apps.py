@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class R4CConfig(AppConfig):
+    name = 'R4C'
+    verbose_name = 'R4C project'
+
+    def ready(self):
+        import R4C.database
+        import R4C.metrics
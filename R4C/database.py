@@ -0,0 +1,47 @@
+"""
+Per-connection database setup.
+
+SQLite keeps most of its tuning in per-connection PRAGMAs, so they are applied
+to every new connection from the connection_created signal. The PRAGMAs come
+from the SQLITE_PRAGMAS setting.
+"""
+import contextlib
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+@contextlib.contextmanager
+def bulk_load_pragmas(connection):
+    """
+        Relax a SQLite connection with SQLITE_BULK_LOAD_PRAGMAS for the duration
+        of the block and restore the previous values afterwards. Other database
+        backends are left alone.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+
+    previous = {}
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_BULK_LOAD_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}")
+            previous[pragma] = cursor.fetchone()[0]
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for pragma, value in previous.items():
+                cursor.execute(f"PRAGMA {pragma} = {value}")
@@ -0,0 +1,292 @@
+import asyncio
+import datetime
+import json
+import math
+import platform
+import random
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from benchmarks.common import codes, test_database
+from customers.models import Customer
+from orders.models import Order
+from R4C.metrics import registry
+from robots.catalogue import catalogue_cache
+from robots.models import Robot, RobotModel, RobotVersion
+from robots.rollup import rebuild_rollup
+from robots.stock import repair_stock
+from robots.waiting_orders import waiting_orders
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# View names per scenario and mode.
+SCENARIOS = {
+    'create': {'threads': 'create_robot', 'async': 'acreate_robot'},
+    'summary': {'threads': 'download_robots_summary', 'async': 'adownload_robots_summary'},
+}
+
+# The summary variants requested in turn.
+SUMMARY_PARAMS = [{}, {'granularity': 'day'}, {'format': 'csv'}, {'format': 'json'}]
+
+SEED_CHUNK_SIZE = 10000
+
+
+def percentile(values, fraction):
+    """The nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    return values[max(math.ceil(len(values) * fraction), 1) - 1]
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process so far, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, timeout=10)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def seed(customers, robots, orders, models, versions, days, rng):
+    """
+        Description:
+        ------------
+            Fill the database with synthetic customers, robots and orders.
+
+            Robots are spread over the catalogue and the last `days` days and are
+            inserted with bulk_create in chunks, so no signals fire and memory
+            stays flat. Half the orders are already fulfilled and hold the
+            oldest robots (as far as there are robots), the rest wait for a
+            random serial. The rollup and the stock counters are rebuilt at the
+            end and the in-process caches dropped.
+
+        Returns:
+        --------
+            list of tuple: The (model, version) pairs of the catalogue.
+    """
+    pairs = [(model, version) for model in codes(models) for version in codes(versions)]
+    robot_models = RobotModel.objects.bulk_create([RobotModel(code=model) for model in codes(models)])
+    RobotVersion.objects.bulk_create(
+        [RobotVersion(model=robot_model, code=version) for robot_model in robot_models for version in codes(versions)],
+        batch_size=1000,
+    )
+
+    Customer.objects.bulk_create(
+        [Customer(email=f'customer{i}@example.com') for i in range(customers)], batch_size=1000
+    )
+    customer_ids = list(Customer.objects.values_list('id', flat=True))
+
+    now = timezone.now()
+    for start in range(0, robots, SEED_CHUNK_SIZE):
+        chunk = []
+        for _ in range(min(SEED_CHUNK_SIZE, robots - start)):
+            model, version = rng.choice(pairs)
+            created = now - datetime.timedelta(seconds=rng.randrange(days * 24 * 60 * 60))
+            chunk.append(Robot(serial=model + version, model=model, version=version, created=created))
+        Robot.objects.bulk_create(chunk, batch_size=1000)
+
+    if customer_ids:
+        shipped = list(Robot.objects.order_by('id').values_list('id', 'serial')[:(orders + 1) // 2])
+        for start in range(0, orders, SEED_CHUNK_SIZE):
+            chunk = []
+            for i in range(start, min(start + SEED_CHUNK_SIZE, orders)):
+                customer_id = rng.choice(customer_ids)
+                if i % 2 == 0 and i // 2 < len(shipped):
+                    robot_id, serial = shipped[i // 2]
+                    chunk.append(Order(customer_id=customer_id, robot_serial=serial, robot_id=robot_id,
+                                       is_fulfilled=True, is_waiting=False))
+                else:
+                    model, version = rng.choice(pairs)
+                    chunk.append(Order(customer_id=customer_id, robot_serial=model + version))
+            Order.objects.bulk_create(chunk, batch_size=1000)
+
+    rebuild_rollup()
+    repair_stock()
+    waiting_orders.invalidate()
+    catalogue_cache.invalidate()
+
+    return pairs
+
+
+def request_factory(scenario, mode, pairs):
+    """A function (client, i) -> response that sends the i-th request of the scenario."""
+    url = reverse(SCENARIOS[scenario][mode])
+
+    if scenario == 'summary':
+        return lambda client, i: client.get(url, SUMMARY_PARAMS[i % len(SUMMARY_PARAMS)])
+
+    start = timezone.now()
+
+    def create(client, i):
+        model, version = pairs[i % len(pairs)]
+        # A distinct production time per request, so that no request is taken for a retry.
+        created = start + datetime.timedelta(microseconds=i)
+        data = {"model": model, "version": version, "created": created.isoformat()}
+        return client.post(url, data=json.dumps(data), content_type='application/json')
+
+    return create
+
+
+def run_threads(send, total, concurrency):
+    """Send `total` requests from `concurrency` threads, one client each. Returns (seconds, latencies, errors)."""
+    remaining = iter(range(total))
+    lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def worker():
+        client = Client()
+        try:
+            while True:
+                with lock:
+                    i = next(remaining, None)
+                if i is None:
+                    break
+                start = time.perf_counter()
+                response = send(client, i)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    if response.status_code >= 400:
+                        errors.append(response.status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return time.perf_counter() - start, latencies, errors
+
+
+def run_async(send, total, concurrency):
+    """Send `total` requests from `concurrency` tasks on one event loop. Returns (seconds, latencies, errors)."""
+    latencies = []
+    errors = []
+
+    async def worker(remaining, client):
+        for i in remaining:
+            start = time.perf_counter()
+            response = await send(client, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+
+    async def main():
+        # One shared iterator: each task takes the next request when it is free.
+        remaining = iter(range(total))
+        await asyncio.gather(*(worker(remaining, AsyncClient()) for _ in range(concurrency)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+
+    return time.perf_counter() - start, latencies, errors
+
+
+def scenario_report(view, seconds, latencies, errors):
+    latencies = sorted(latencies)
+    requests = sum(count for labels, count in registry.requests.items() if labels[0] == ('view', view))
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': round(seconds, 3),
+        'throughput': round(len(latencies) / seconds, 1) if seconds else 0.0,
+        'latency_ms': {
+            name: round(percentile(latencies, fraction) * 1000, 2)
+            for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+        },
+        'queries_per_request': round(registry.db_queries[(('view', view),)] / requests, 2) if requests else None,
+        'peak_memory_mb': peak_memory_mb(),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database with synthetic customers, robots and orders, drive the robot "
+        "endpoints with concurrent local clients and print throughput, latency percentiles, "
+        "queries per request and peak memory as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000, help="Customers to seed.")
+        parser.add_argument('--robots', type=int, default=100000, help="Robots to seed.")
+        parser.add_argument('--orders', type=int, default=10000, help="Orders to seed, half of them waiting.")
+        parser.add_argument('--models', type=int, default=20, help="Robot models in the catalogue.")
+        parser.add_argument('--versions', type=int, default=5, help="Versions per robot model.")
+        parser.add_argument('--days', type=int, default=30, help="Days of production history to seed.")
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS),
+                            help="Endpoints to drive, one after the other.")
+        parser.add_argument('--mode', choices=('threads', 'async'), default='threads',
+                            help="Threads against the sync views, or tasks on an event loop against the async ones.")
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per scenario.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed of the synthetic data.")
+        parser.add_argument('--output', help="Write the report to this file instead of standard output.")
+
+    def handle(self, *args, **options):
+        if options['models'] < 1 or options['versions'] < 1 or options['concurrency'] < 1 or options['days'] < 1:
+            raise CommandError("--models, --versions, --concurrency and --days must be positive")
+        if min(options['customers'], options['robots'], options['orders'], options['requests']) < 0:
+            raise CommandError("--customers, --robots, --orders and --requests must not be negative")
+
+        report = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'options': {key: options[key] for key in (
+                'customers', 'robots', 'orders', 'models', 'versions', 'days',
+                'mode', 'requests', 'concurrency', 'seed',
+            )},
+            'seed': None,
+            'scenarios': {},
+        }
+
+        # The runs never touch the configured database: like the test runner,
+        # they work on a test database that is dropped afterwards.
+        with test_database():
+            start = time.perf_counter()
+            pairs = seed(options['customers'], options['robots'], options['orders'],
+                         options['models'], options['versions'], options['days'], random.Random(options['seed']))
+            report['seed'] = {'seconds': round(time.perf_counter() - start, 3), 'peak_memory_mb': peak_memory_mb()}
+            self.stderr.write(f"Seeded in {report['seed']['seconds']:.1f}s")
+
+            run = run_async if options['mode'] == 'async' else run_threads
+            for scenario in options['scenarios']:
+                view = SCENARIOS[scenario][options['mode']]
+                send = request_factory(scenario, options['mode'], pairs)
+                registry.reset()
+                seconds, latencies, errors = run(send, options['requests'], options['concurrency'])
+                report['scenarios'][scenario] = scenario_report(view, seconds, latencies, errors)
+                self.stderr.write(f"{scenario}: {report['scenarios'][scenario]['throughput']} req/s")
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
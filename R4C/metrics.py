@@ -0,0 +1,231 @@
+"""
+In-process request metrics, exposed in the Prometheus text format.
+
+MetricsMiddleware times every request, in sync or async mode, and an execute
+wrapper installed on every database connection times the queries it runs. Code
+paths worth a breakdown are wrapped in timed(phase), which adds their duration
+to the current request, if there is one, and to a process-wide histogram.
+Everything lives in memory and is per process: scrape every worker, as with
+any Prometheus client library.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+
+# Upper bounds, in seconds, of the histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed durations, per label set."""
+
+    def __init__(self):
+        self.series = defaultdict(lambda: {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0})
+
+    def observe(self, labels, value):
+        series = self.series[labels]
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                series['buckets'][i] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.request_duration = Histogram()
+            self.phase_duration = Histogram()
+            self.requests = defaultdict(int)
+            self.db_queries = defaultdict(int)
+            self.db_seconds = defaultdict(float)
+            self.view_phase_seconds = defaultdict(float)
+
+    def record_request(self, view, method, status, seconds, timings):
+        with self._lock:
+            self.request_duration.observe((('view', view),), seconds)
+            self.requests[(('view', view), ('method', method), ('status', str(status)))] += 1
+            self.db_queries[(('view', view),)] += timings['db_queries']
+            self.db_seconds[(('view', view),)] += timings['db']
+            for phase, phase_seconds in timings['phases'].items():
+                self.view_phase_seconds[(('view', view), ('phase', phase))] += phase_seconds
+
+    def record_phase(self, phase, seconds):
+        with self._lock:
+            self.phase_duration.observe((('phase', phase),), seconds)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            render_histogram(lines, 'r4c_request_duration_seconds', "Request latency per view.",
+                             self.request_duration)
+            render_counter(lines, 'r4c_requests_total', "Requests per view, method and status.", self.requests)
+            render_counter(lines, 'r4c_db_queries_total', "Database queries run by requests, per view.",
+                           self.db_queries)
+            render_counter(lines, 'r4c_db_query_seconds_total', "Time requests spent in database queries, per view.",
+                           self.db_seconds)
+            render_counter(lines, 'r4c_view_phase_seconds_total', "Time requests spent in timed phases, per view.",
+                           self.view_phase_seconds)
+            render_histogram(lines, 'r4c_phase_duration_seconds',
+                             "Duration of timed phases (email sending, workbook generation, ...), in or out of requests.",
+                             self.phase_duration)
+
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}' if labels else ''
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_counter(lines, name, help_text, values):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in sorted(values.items()):
+        lines.append(f"{name}{format_labels(labels)} {value}")
+
+
+def render_histogram(lines, name, help_text, histogram):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, series in sorted(histogram.series.items()):
+        for bound, count in zip(BUCKETS, series['buckets']):
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {count}")
+        lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {series['count']}")
+        lines.append(f"{name}_sum{format_labels(labels)} {series['sum']}")
+        lines.append(f"{name}_count{format_labels(labels)} {series['count']}")
+
+
+registry = MetricsRegistry()
+
+# Timings of the request being handled: query count and time, and time per phase.
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+@contextlib.contextmanager
+def timed(phase):
+    """Time the block as `phase`, for the current request if any and the process-wide histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        registry.record_phase(phase, seconds)
+        timings = _request_timings.get()
+        if timings is not None:
+            with timings['lock']:
+                timings['phases'][phase] = timings['phases'].get(phase, 0.0) + seconds
+
+
+def server_timing(timings, total):
+    """A Server-Timing header value: total, database and phase durations in milliseconds."""
+    entries = [
+        f'total;dur={total * 1000:.1f}',
+        f'db;dur={timings["db"] * 1000:.1f};desc="{timings["db_queries"]} queries"',
+    ]
+    entries += [f'{phase};dur={seconds * 1000:.1f}' for phase, seconds in timings['phases'].items()]
+
+    return ', '.join(entries)
+
+
+def time_query(execute, sql, params, many, context):
+    """Execute wrapper that adds every query to the timings of the current request, if there is one."""
+    timings = _request_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        with timings['lock']:
+            timings['db'] += time.perf_counter() - start
+            timings['db_queries'] += 1
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    """
+        Time the queries of every connection. Connections belong to a thread,
+        and the request timings follow the context into the threads that async
+        views run their queries in. The wrapper goes first, since
+        connection.execute_wrapper() removes the last one on exit.
+    """
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+class MetricsMiddleware:
+    """
+        Record latency, database queries and timed phases of every request and
+        report them to the client in a Server-Timing header.
+
+        It runs in the mode of the rest of the chain, so that under ASGI the
+        async views are not adapted back to sync for it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @contextlib.contextmanager
+    def track(self):
+        """Collect the timings of the request handled in the block."""
+        timings = {'db': 0.0, 'db_queries': 0, 'phases': {}, 'lock': threading.Lock()}
+        token = _request_timings.set(timings)
+        try:
+            yield timings
+        finally:
+            _request_timings.reset(token)
+
+    def record(self, request, response, timings, total):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        registry.record_request(view, request.method, response.status_code, total, timings)
+        response['Server-Timing'] = server_timing(timings, total)
+
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        with self.track() as timings:
+            response = self.get_response(request)
+
+        return self.record(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with self.track() as timings:
+            response = await self.get_response(request)
+
+        return self.record(request, response, timings, time.perf_counter() - start)
+
+
+def metrics(req):
+    """The metrics of this process in the Prometheus text format."""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
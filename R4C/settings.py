@@ -37,12 +37,15 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'R4C',
     'customers',
     'orders',
     'robots'
 ]
 
 MIDDLEWARE = [
+    # First, so that it times the whole middleware chain.
+    'R4C.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,11 +79,72 @@ WSGI_APPLICATION = 'R4C.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Set R4C_DATABASE to "postgres" to run on PostgreSQL; its connection parameters
+# come from the R4C_DATABASE_* variables. With R4C_DATABASE_POOL=1 connections are
+# taken from Django's native psycopg pool (requires psycopg[pool]) instead of being
+# kept open per thread for CONN_MAX_AGE seconds.
+DATABASE_BACKENDS = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'NAME': os.environ.get('R4C_DATABASE_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so that concurrent
+            # writers wait for each other (up to the busy timeout) instead of
+            # failing when a read lock cannot be upgraded.
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # A file rather than the in-memory default, whose shared cache fails
+        # concurrent writers at once instead of letting them wait.
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('R4C_DATABASE_NAME', 'r4c'),
+        'USER': os.environ.get('R4C_DATABASE_USER', ''),
+        'PASSWORD': os.environ.get('R4C_DATABASE_PASSWORD', ''),
+        'HOST': os.environ.get('R4C_DATABASE_HOST', ''),
+        'PORT': os.environ.get('R4C_DATABASE_PORT', ''),
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('R4C_DATABASE_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('R4C_DATABASE_POOL_MAX_SIZE', 20)),
+                # Seconds a request waits for a free connection.
+                'timeout': 10,
+            },
+        } if os.environ.get('R4C_DATABASE_POOL') == '1' else {},
+    },
+}
+
+DATABASES = {
+    'default': DATABASE_BACKENDS[os.environ.get('R4C_DATABASE', 'sqlite')],
+}
+# Pooled connections go back to the pool after every request; other connections
+# are reused for CONN_MAX_AGE seconds instead of reconnecting per request.
+DATABASES['default']['CONN_MAX_AGE'] = (
+    0 if 'pool' in DATABASES['default']['OPTIONS'] else int(os.environ.get('R4C_CONN_MAX_AGE', 60))
+)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Applied to every new SQLite connection (see R4C/database.py).
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer and vice versa.
+    'journal_mode': 'WAL',
+    # With WAL, fsync at checkpoints only; a power loss can drop the last
+    # transactions but never corrupts the database.
+    'synchronous': 'NORMAL',
+    # Milliseconds a connection waits for a lock before "database is locked".
+    'busy_timeout': 20000,
+    # Read the database through a memory map of up to 256 MiB.
+    'mmap_size': 256 * 1024 * 1024,
+}
+# Applied by bulk loads (manage.py import_robots --fast) for their duration.
+SQLITE_BULK_LOAD_PRAGMAS = {
+    # No fsync at all: an OS crash or power loss during the load can corrupt
+    # the database, so only use it on data that can be loaded again.
+    'synchronous': 'OFF',
+    # A 256 MiB page cache (negative values are in KiB) for the index updates.
+    'cache_size': -256 * 1024,
+    'temp_store': 'MEMORY',
 }
 
 
@@ -124,6 +188,118 @@ STATIC_URL = '/static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+
+# Robots ingestion
+
+# JSON codec of the robots API: "auto" uses orjson or msgspec when installed and the
+# standard library otherwise; "orjson", "msgspec" or "json" pin one.
+ROBOTS_JSON_CODEC = 'auto'
+
+# Accept only robots whose model and version are registered in the catalogue.
+ROBOTS_VALIDATE_CATALOGUE = True
+# Seconds before the in-process catalogue cache reloads changes made by other processes.
+ROBOTS_CATALOGUE_CACHE_TTL = 60
+
+# Seconds before the in-process waiting-order index is resynchronised with the
+# database, which picks up orders written by other processes.
+ROBOTS_WAITING_INDEX_RESYNC_INTERVAL = 60
+
+# Idempotency keys of recently created robots kept in memory to answer retries
+# without a database query.
+ROBOTS_IDEMPOTENCY_CACHE_SIZE = 50000
+
+# Largest number of records accepted by a single bulk request.
+ROBOTS_BULK_MAX_BATCH_SIZE = 10000
+# Rows per INSERT statement issued by bulk ingestion.
+ROBOTS_BULK_CHUNK_SIZE = 500
+# Robots per committed chunk of a streaming NDJSON upload.
+ROBOTS_STREAM_CHUNK_SIZE = 1000
+# Rejected lines reported in detail per streaming upload.
+ROBOTS_STREAM_MAX_ERRORS = 1000
+# Robots per committed chunk of a file import (manage.py import_robots).
+ROBOTS_IMPORT_CHUNK_SIZE = 20000
+
+
+# Production summary report
+
+# Cache for generated summary files. Entries are keyed by the data version kept
+# in the database, so a per-process cache is never stale, only colder. Set
+# R4C_REPORT_CACHE to "file" or "redis" to share it between processes; the redis
+# backend works with any Redis-compatible server (Redis, Valkey, KeyDB) at
+# R4C_REPORT_CACHE_LOCATION. The local memory and file backends evict a quarter
+# of the entries once MAX_ENTRIES is reached; for Redis set maxmemory with an LRU
+# policy on the server.
+REPORT_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'r4c-reports',
+        'OPTIONS': {'MAX_ENTRIES': 200, 'CULL_FREQUENCY': 4},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('R4C_REPORT_CACHE_LOCATION', os.path.join(BASE_DIR, '.cache', 'reports')),
+        'OPTIONS': {'MAX_ENTRIES': 200, 'CULL_FREQUENCY': 4},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('R4C_REPORT_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reports': {
+        **REPORT_CACHE_BACKENDS[os.environ.get('R4C_REPORT_CACHE', 'locmem')],
+        'TIMEOUT': 24 * 60 * 60,
+    },
+}
+
+ROBOTS_SUMMARY_CACHE_ALIAS = 'reports'
+# Summary files larger than this are not cached; with MAX_ENTRIES this caps the cache size.
+ROBOTS_SUMMARY_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+# Threads rendering summary workbooks for the async views.
+ROBOTS_REPORT_WORKERS = 4
+
+# Always build the summary with write-only worksheets and stream it (?stream=1 per request).
+ROBOTS_SUMMARY_WRITE_ONLY = False
+# Bytes of a streamed summary kept in memory before it is spooled to a temporary file.
+ROBOTS_SUMMARY_SPOOL_MAX_SIZE = 5 * 1024 * 1024
+
+
+# Robots listing and export
+
+# Robots per page of the listing API, by default and at most.
+ROBOTS_LIST_PAGE_SIZE = 100
+ROBOTS_LIST_MAX_PAGE_SIZE = 1000
+# Rows fetched from the database at a time by the streaming export.
+ROBOTS_EXPORT_CHUNK_SIZE = 2000
+
+
+# Order placement API
+
+# Largest number of orders accepted by a single bulk request.
+ORDERS_BULK_MAX_BATCH_SIZE = 1000
+# Times an order batch is placed again after losing a robot to a concurrent reservation.
+ORDERS_RESERVATION_ATTEMPTS = 5
+
+
+# Notification outbox, drained by `python manage.py send_notifications`
+
+# Notifications claimed by the worker per batch.
+NOTIFICATIONS_BATCH_SIZE = 100
+# Threads sending emails concurrently.
+NOTIFICATIONS_WORKERS = 4
+# Attempts before a notification is marked as failed.
+NOTIFICATIONS_MAX_ATTEMPTS = 5
+# Retry backoff in seconds: doubles after every failed attempt, up to the maximum.
+NOTIFICATIONS_RETRY_BASE_DELAY = 30
+NOTIFICATIONS_RETRY_MAX_DELAY = 3600
+# Seconds a claimed batch is hidden from other workers while it is being sent.
+NOTIFICATIONS_LEASE_SECONDS = 300
+
 # EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # EMAIL_HOST = 'smtp.mailtrap.io'  # Пример SMTP сервера
 # EMAIL_PORT = 587
@@ -0,0 +1,136 @@
+import json
+import random
+from unittest import skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from R4C.database import bulk_load_pragmas
+from R4C.management.commands.benchmark import percentile, request_factory, seed
+from R4C.metrics import registry
+from customers.models import Customer
+from orders.models import Order
+from robots.models import Robot, RobotDailyCount, RobotModel, RobotVersion
+from robots.notifications import deliver_notifications
+from robots.report_cache import report_cache
+from robots.stock import current_stock
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite connection settings")
+class SQLiteConnectionTestCase(TestCase):
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 20000)
+        self.assertEqual(self.pragma('mmap_size'), 256 * 1024 * 1024)
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        self.assertEqual(connection.settings_dict['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite connection settings")
+class BulkLoadPragmasTestCase(TransactionTestCase):
+    # PRAGMA synchronous cannot be changed inside a transaction, as TestCase runs.
+
+    pragma = SQLiteConnectionTestCase.pragma
+
+    def test_bulk_load_pragmas_are_restored(self):
+        with bulk_load_pragmas(connection):
+            self.assertEqual(self.pragma('synchronous'), 0)
+            self.assertEqual(self.pragma('cache_size'), -256 * 1024)
+
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertNotEqual(self.pragma('cache_size'), -256 * 1024)
+
+
+class MetricsTestCase(TestCase):
+
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+        report_cache().clear()
+        RobotVersion.objects.create(model=RobotModel.objects.create(code='R2'), code='D2')
+
+    def test_request_metrics_and_server_timing(self):
+        response = self.client.post(
+            reverse('create_robot'),
+            data=json.dumps({"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}),
+            content_type='application/json'
+        )
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", robot_post_save;dur=[\d.]+$')
+
+        metrics = self.client.get(reverse('metrics'))
+        self.assertEqual(metrics['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        text = metrics.content.decode()
+        self.assertIn('r4c_request_duration_seconds_count{view="create_robot"} 1', text)
+        self.assertIn('r4c_request_duration_seconds_bucket{view="create_robot",le="+Inf"} 1', text)
+        self.assertIn('r4c_requests_total{view="create_robot",method="POST",status="201"} 1', text)
+        self.assertRegex(text, r'r4c_db_queries_total\{view="create_robot"\} [1-9]\d*')
+        self.assertIn('r4c_view_phase_seconds_total{view="create_robot",phase="robot_post_save"}', text)
+
+    async def test_async_views_stay_async(self):
+        await Robot.objects.acreate(serial='R2D2', model='R2', version='D2', created=timezone.now())
+
+        # The handler only logs the adaptation of a middleware to sync when DEBUG is on.
+        with override_settings(DEBUG=True), self.assertNoLogs('django.request', 'DEBUG'):
+            response = await self.async_client.get(reverse('adownload_robots_summary'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries", xlsx;dur=')
+        self.assertIn('r4c_requests_total{view="adownload_robots_summary",method="GET",status="200"} 1',
+                      registry.render())
+
+    def test_workbook_and_email_phases(self):
+        response = self.client.get(reverse('download_robots_summary'))
+        self.assertIn('xlsx;dur=', response['Server-Timing'])
+
+        customer = Customer.objects.create(email='customer@example.com')
+        Order.objects.create(robot_serial='R2D2', customer=customer)
+        Robot.objects.create(serial='R2D2', model='R2', version='D2', created=timezone.now())
+        deliver_notifications()
+
+        text = registry.render()
+        self.assertIn('r4c_phase_duration_seconds_count{phase="xlsx"} 1', text)
+        self.assertIn('r4c_phase_duration_seconds_count{phase="email"} 1', text)
+
+
+class BenchmarkTestCase(TestCase):
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual([percentile(values, fraction) for fraction in (0.5, 0.95, 0.99, 1.0)], [50, 95, 99, 100])
+        self.assertEqual(percentile([7], 0.5), 7)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_seed_and_requests(self):
+        pairs = seed(customers=5, robots=300, orders=40, models=3, versions=2, days=7, rng=random.Random(0))
+
+        self.assertEqual(len(pairs), 6)
+        self.assertEqual(RobotVersion.objects.count(), 6)
+        self.assertEqual(Robot.objects.count(), 300)
+        self.assertEqual(Order.objects.filter(is_waiting=True).count(), 20)
+        self.assertEqual(Order.objects.filter(is_fulfilled=True, robot__isnull=False).count(), 20)
+        self.assertEqual(sum(RobotDailyCount.objects.values_list('count', flat=True)), 300)
+        self.assertEqual(sum(current_stock().values()), 280)
+
+        send = request_factory('create', 'threads', pairs)
+        self.assertEqual([send(self.client, i).status_code for i in range(3)], [201, 201, 201])
+        send = request_factory('summary', 'threads', pairs)
+        self.assertEqual({send(self.client, i).status_code for i in range(4)}, {200})
+
+    def test_benchmark_rejects_invalid_sizes(self):
+        for option, value in (('--days', 0), ('--concurrency', 0), ('--robots', -1), ('--requests', -1)):
+            with self.subTest(option=option), self.assertRaises(CommandError):
+                call_command('benchmark', option, str(value))
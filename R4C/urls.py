@@ -16,8 +16,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from R4C.metrics import metrics
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('robots/', include('robots.urls'))
+    path('robots/', include('robots.urls')),
+    path('orders/', include('orders.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
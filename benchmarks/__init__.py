@@ -0,0 +1,9 @@
+"""
+Standalone benchmarks for the R4C service.
+
+Each module is runnable from the repository root, e.g.
+
+    python -m benchmarks.summary_queries
+
+and works against a throwaway test database, never the configured one.
+"""
@@ -0,0 +1,108 @@
+"""
+Throughput of the sync and async robots views under concurrent clients.
+
+Start the project under an ASGI server first, for example
+
+    uvicorn R4C.asgi:application --workers 1
+    # or: daphne R4C.asgi:application
+
+then run
+
+    python -m benchmarks.asgi_load --url http://127.0.0.1:8000 [--endpoint create|summary]
+                                   [--concurrency 32] [--requests 2000]
+
+The create endpoint writes real robots into the server's database, so point
+it at a scratch database. --model/--version must be in the robot catalogue.
+"""
+import argparse
+import datetime
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+PATHS = {
+    'create': {'sync': '/robots/create/', 'async': '/robots/async/create/'},
+    'summary': {'sync': '/robots/download_robots_summary/', 'async': '/robots/async/download_robots_summary/'},
+}
+
+
+def create_body(model, version):
+    """A function i -> body of the i-th create request."""
+    start = datetime.datetime.now()
+
+    # A distinct production time per request, so that no request is taken for a retry.
+    return lambda i: json.dumps({
+        "model": model, "version": version, "created": (start + datetime.timedelta(microseconds=i)).isoformat(),
+    })
+
+
+def run(url, path, method, body, concurrency, total):
+    """
+    Send `total` requests from `concurrency` keep-alive clients, the i-th with
+    body(i) if there is a body. Returns (seconds, latencies, errors).
+    """
+    target = urlsplit(url)
+    remaining = iter(range(total))
+    lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def client():
+        connection = HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        while True:
+            with lock:
+                i = next(remaining, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=body and body(i), headers={'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except OSError:
+                connection.close()
+                connection = HTTPConnection(target.hostname, target.port or 80, timeout=30)
+                ok = False
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                if not ok:
+                    errors.append(path)
+        connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+
+    return time.perf_counter() - start, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--endpoint', choices=PATHS, default='create')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--model', default='R2')
+    parser.add_argument('--version', default='D2')
+    args = parser.parse_args()
+
+    method = 'POST' if args.endpoint == 'create' else 'GET'
+
+    print(f"{args.endpoint}: {args.requests} requests from {args.concurrency} clients against {args.url}")
+    for mode, path in PATHS[args.endpoint].items():
+        body = create_body(args.model, args.version) if method == 'POST' else None
+        elapsed, latencies, errors = run(args.url, path, method, body, args.concurrency, args.requests)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        print(f"{mode:<5}  {len(latencies) / elapsed:8.1f} req/s  "
+              f"p50 {latencies[len(latencies) // 2] * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  "
+              f"errors {len(errors)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Validation cost per ingested record: the in-process catalogue cache against
+a database lookup of the model/version pair for every record.
+
+    python -m benchmarks.catalogue_validation [--records 20000] [--models 100] [--versions 50]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import codes, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--models', type=int, default=100)
+    parser.add_argument('--versions', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from robots.catalogue import catalogue_cache
+    from robots.ingest import validate_robot_data
+    from robots.models import RobotModel, RobotVersion
+
+    with test_database():
+        models = RobotModel.objects.bulk_create(RobotModel(code=code) for code in codes(args.models))
+        RobotVersion.objects.bulk_create(
+            RobotVersion(model=model, code=code) for model in models for code in codes(args.versions)
+        )
+        catalogue_cache.invalidate()
+
+        rng = random.Random(0)
+        records = [
+            {
+                "model": rng.choice(models).code,
+                "version": rng.choice(codes(args.versions)),
+                "created": "2024-12-12 10:00:00",
+            }
+            for _ in range(args.records)
+        ]
+
+        def database_lookup(record):
+            validate_robot_data(record)
+            RobotVersion.objects.filter(
+                model__code=record['model'], code=record['version']
+            ).values_list('id', flat=True).first()
+
+        print(f"{args.records} records, catalogue of {args.models * args.versions} versions")
+        for label, validate in (('catalogue cache', validate_robot_data), ('+ database lookup', database_lookup)):
+            start = time.perf_counter()
+            for record in records:
+                validate(record)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<18}  {elapsed / args.records * 1e6:8.1f} us/record")
+
+
+if __name__ == '__main__':
+    main()
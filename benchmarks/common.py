@@ -0,0 +1,63 @@
+import contextlib
+import os
+import string
+import sys
+import time
+from itertools import product
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    """Configure Django with the project settings so a benchmark can run as a plain script."""
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'R4C.settings')
+
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """Run the block against a freshly created test database, as the test runner does."""
+    from django.test.utils import (
+        setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def codes(count):
+    """The first `count` two-character model/version codes: AA, AB, ..."""
+    alphabet = string.ascii_uppercase + string.digits
+    return [a + b for a, b in product(alphabet, repeat=2)][:count]
+
+
+@contextlib.contextmanager
+def measure(results, label):
+    """Record wall time and query count of the block into results[label]."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+
+    results[label] = {'seconds': elapsed, 'queries': len(queries)}
+
+
+def print_results(results):
+    width = max(len(label) for label in results)
+    for label, result in results.items():
+        line = f"{label:<{width}}  {result['seconds'] * 1000:10.1f} ms"
+        if 'queries' in result:
+            line += f"  {result['queries']:6d} queries"
+        print(line)
@@ -0,0 +1,119 @@
+"""
+"database is locked" errors under concurrent ingest on SQLite: SQLite's defaults
+(rollback journal, deferred transactions) against the tuned configuration
+(WAL, synchronous=NORMAL, busy timeout, mmap, immediate transactions).
+
+Writer threads alternate between creating robots and placing orders, which
+read stock before they write; reader threads page through the robot list.
+
+    python -m benchmarks.concurrent_writers [--writers 8] [--readers 2] [--operations 100]
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.common import setup_django, test_database
+
+
+def run_workload(writers, readers, operations):
+    from django.db import OperationalError, connection
+    from django.utils import timezone
+
+    from orders.placement import place_orders
+    from robots.ingest import create_robot_once, validate_robot_data
+    from robots.listing import filter_robots, page_robots
+    from robots.models import RobotModel, RobotVersion
+
+    model = RobotModel.objects.create(code='R2')
+    RobotVersion.objects.create(model=model, code='D2')
+
+    stats = {'writes': 0, 'reads': 0, 'locked': 0, 'other_errors': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(writers + readers)
+
+    def count(key):
+        with lock:
+            stats[key] += 1
+
+    def attempt(operation, key):
+        try:
+            operation()
+        except OperationalError as e:
+            count('locked' if 'locked' in str(e) else 'other_errors')
+        else:
+            count(key)
+
+    def writer(n):
+        try:
+            barrier.wait()
+            for i in range(operations):
+                if i % 2:
+                    attempt(lambda: place_orders([{'email': f'c{n}@example.com', 'robot_serial': 'R2D2'}]), 'writes')
+                else:
+                    fields = validate_robot_data({
+                        'model': 'R2', 'version': 'D2', 'created': timezone.now().isoformat(),
+                        'idempotency_key': f'{n}:{i}',
+                    })
+                    attempt(lambda: create_robot_once(fields), 'writes')
+        finally:
+            connection.close()
+
+    def reader():
+        try:
+            barrier.wait()
+            for _ in range(operations):
+                attempt(lambda: page_robots(filter_robots({}), limit=50), 'reads')
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats['seconds'] = time.perf_counter() - start
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--operations', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connections
+    from django.test import override_settings
+
+    options = connections['default'].settings_dict['OPTIONS']
+    tuned_options = dict(options)
+    default_options = {key: value for key, value in options.items() if key != 'transaction_mode'}
+    # What SQLite does without SQLITE_PRAGMAS; the busy timeout stays at the
+    # 5 seconds Python's sqlite3 module sets.
+    default_pragmas = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+    print(f"{args.writers} writers and {args.readers} readers, {args.operations} operations each")
+    for label, pragmas, scenario_options in (
+        ('SQLite defaults', default_pragmas, default_options),
+        ('tuned', None, tuned_options),
+    ):
+        options.clear()
+        options.update(scenario_options)
+        with override_settings(**({'SQLITE_PRAGMAS': pragmas} if pragmas else {})), test_database():
+            stats = run_workload(args.writers, args.readers, args.operations)
+
+        attempts = stats['writes'] + stats['reads'] + stats['locked'] + stats['other_errors']
+        print(
+            f"{label:<16}  {stats['locked'] / attempts:6.1%} locked"
+            f"  {stats['other_errors']:4d} other errors"
+            f"  {stats['writes'] / stats['seconds']:8.1f} writes/s"
+            f"  {stats['reads'] / stats['seconds']:8.1f} reads/s"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Per-request cost of decoding a create_robot payload, parsing its timestamp
+and serialising the response: stdlib json + parse_datetime + JsonResponse
+against the robots codec + parse_created + json_response.
+
+    python -m benchmarks.json_codec [--iterations 100000]
+
+orjson and msgspec are measured when installed.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import setup_django
+
+
+def per_call(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.http import JsonResponse
+    from django.utils.dateparse import parse_datetime
+    from robots import codec
+    from robots.ingest import parse_created
+
+    body = b'{"model":"R2","version":"D2","created":"2022-12-31 23:59:59"}'
+    result = {'message': "Robot created succesfully", 'id': 123456}
+
+    def baseline():
+        data = json.loads(body)
+        parse_datetime(data['created'])
+        JsonResponse(result, status=201)
+
+    def fast():
+        data = codec.loads(body)
+        parse_created(data['created'])
+        codec.json_response(result, status=201)
+
+    print(f"codec in use: {codec.CODEC}")
+    steps = {
+        'json.loads': lambda: json.loads(body),
+        'codec.loads': lambda: codec.loads(body),
+        'parse_datetime': lambda: parse_datetime('2022-12-31 23:59:59'),
+        'parse_created': lambda: parse_created('2022-12-31 23:59:59'),
+        'JsonResponse': lambda: JsonResponse(result, status=201),
+        'json_response': lambda: codec.json_response(result, status=201),
+        'request, stdlib': baseline,
+        'request, fast path': fast,
+    }
+    for label, function in steps.items():
+        print(f"{label:<20}  {per_call(function, args.iterations):6.2f} us")
+
+
+if __name__ == '__main__':
+    main()
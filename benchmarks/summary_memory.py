@@ -0,0 +1,49 @@
+"""
+Peak Python memory of building and saving the summary workbook, in-memory
+Workbook against write-only worksheets spooled to a temporary file.
+
+    python -m benchmarks.summary_memory [--models 500] [--versions 100]
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+from benchmarks.common import codes, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--models', type=int, default=500)
+    parser.add_argument('--versions', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from robots.reports import build_summary_workbook, save_workbook_to_spooled_file
+
+    summary = [(model, [(version, 10) for version in codes(args.versions)]) for model in codes(args.models)]
+
+    def in_memory():
+        wb = build_summary_workbook(summary)
+        wb.save(io.BytesIO())
+
+    def write_only():
+        wb = build_summary_workbook(summary, write_only=True)
+        save_workbook_to_spooled_file(wb).close()
+
+    print(f"{args.models} sheets x {args.versions} rows")
+    for label, build in (('in-memory workbook', in_memory), ('write-only, spooled', write_only)):
+        start = time.perf_counter()
+        build()
+        elapsed = time.perf_counter() - start
+
+        # Timed separately: tracing allocations slows openpyxl down many times over.
+        tracemalloc.start()
+        build()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:<20}  {elapsed * 1000:10.1f} ms  {peak / 2 ** 20:8.1f} MiB peak")
+
+
+if __name__ == '__main__':
+    main()
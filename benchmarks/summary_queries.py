@@ -0,0 +1,89 @@
+"""
+Query count and wall time of the weekly summary: the per-model loop that
+generate_robot_summary used to run, the single GROUP BY over robots that
+summary_rows runs outside the default time zone, and the daily rollup that it
+reads in the default time zone.
+
+    python -m benchmarks.summary_queries [--models 100] [--versions 50] [--robots-per-version 2]
+"""
+import argparse
+import datetime
+import zoneinfo
+
+from benchmarks.common import codes, measure, print_results, setup_django, test_database
+
+
+def legacy_summary(robots):
+    """The original 1+N query implementation, kept here as the baseline."""
+    from django.db.models import Count
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook()
+    for model in robots.values('model').distinct():
+        model_name = model['model']
+        version_summary = robots.filter(model=model_name).values('version').annotate(count=Count('id'))
+        ws = wb.create_sheet(title=model_name)
+        ws.append(['Модель', 'Версия', 'Количество за неделю'])
+        for entry in version_summary:
+            ws.append([model_name, entry['version'], entry['count']])
+
+        for col in range(1, 4):
+            max_length = 0
+            for row in ws.iter_rows(min_col=col, max_col=col):
+                for cell in row:
+                    max_length = max(max_length, len(str(cell.value)))
+            ws.column_dimensions[get_column_letter(col)].width = max_length + 2
+
+    return wb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--models', type=int, default=100)
+    parser.add_argument('--versions', type=int, default=50)
+    parser.add_argument('--robots-per-version', type=int, default=2)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.utils import timezone
+    from robots.models import Robot
+    from robots.reports import build_summary_workbook, group_by_model, summary_rows
+    from robots.rollup import rebuild_rollup
+
+    with test_database():
+        now = timezone.now()
+        Robot.objects.bulk_create(
+            [
+                Robot(serial=model + version, model=model, version=version, created=now)
+                for model in codes(args.models)
+                for version in codes(args.versions)
+                for _ in range(args.robots_per_version)
+            ],
+            batch_size=1000,
+        )
+        robots = Robot.objects.filter(created__gte=now - datetime.timedelta(days=7))
+
+        def weekly_summary(tz):
+            end = timezone.localdate(timezone=tz)
+            rows = summary_rows(end - datetime.timedelta(days=6), end, tz)
+            return build_summary_workbook(group_by_model((row['model'], row['version'], row['count']) for row in rows))
+
+        results = {}
+        with measure(results, 'legacy per-model queries'):
+            legacy_summary(robots)
+        with measure(results, 'single GROUP BY query'):
+            # Outside the default time zone summary_rows groups the robots themselves.
+            weekly_summary(zoneinfo.ZoneInfo('Pacific/Kiritimati'))
+
+        rebuild_rollup()
+        with measure(results, 'daily rollup'):
+            weekly_summary(timezone.get_default_timezone())
+
+    print(f"{args.models} models x {args.versions} versions, "
+          f"{args.models * args.versions * args.robots_per_version} robots")
+    print_results(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:58
+
+from django.db import migrations, models
+
+
+def merge_duplicate_customers(apps, schema_editor):
+    """
+        Move the orders of customers stored more than once under an email to
+        the first of them, the one orders were placed for, and delete the rest.
+    """
+    Customer = apps.get_model('customers', 'Customer')
+    Order = apps.get_model('orders', 'Order')
+
+    duplicated = list(
+        Customer.objects.values('email').annotate(count=models.Count('id'), first_id=models.Min('id'))
+        .filter(count__gt=1).values_list('email', 'first_id')
+    )
+    for email, first_id in duplicated:
+        duplicates = Customer.objects.filter(email=email).exclude(id=first_id)
+        Order.objects.filter(customer__in=duplicates).update(customer_id=first_id)
+        duplicates.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_alter_customer_id'),
+        ('orders', '0006_order_robot'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_customers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customer',
+            name='email',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+    ]
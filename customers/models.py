@@ -2,4 +2,4 @@ from django.db import models
 
 
 class Customer(models.Model):
-    email = models.CharField(max_length=255,blank=False, null=False)
+    email = models.CharField(max_length=255,blank=False, null=False, unique=True)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_alter_customer_id'),
+        ('orders', '0004_remove_order_created_at_remove_order_robot_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_waiting', True)), fields=['robot_serial'], name='order_waiting_serial_idx'),
+        ),
+    ]
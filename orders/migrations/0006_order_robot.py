@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_fulfilled_orders(apps, schema_editor):
+    """
+        Link the orders fulfilled before orders held robots to robots of their
+        serial, oldest orders to oldest robots, so that those robots no longer
+        count as free. Orders left over once a serial runs out of robots stay
+        unlinked.
+    """
+    Order = apps.get_model('orders', 'Order')
+    Robot = apps.get_model('robots', 'Robot')
+
+    fulfilled = Order.objects.filter(is_fulfilled=True, robot__isnull=True)
+    for serial in fulfilled.values_list('robot_serial', flat=True).distinct().order_by('robot_serial'):
+        order_ids = list(fulfilled.filter(robot_serial=serial).order_by('id').values_list('id', flat=True))
+        robot_ids = Robot.objects.filter(serial=serial).order_by('id').values_list('id', flat=True)[:len(order_ids)]
+        Order.objects.bulk_update(
+            [Order(id=order_id, robot_id=robot_id) for order_id, robot_id in zip(order_ids, robot_ids)],
+            ['robot'],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_hot_lookup_indexes'),
+        ('robots', '0007_robot_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='robot',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order', to='robots.robot'),
+        ),
+        migrations.RunPython(link_fulfilled_orders, migrations.RunPython.noop),
+    ]
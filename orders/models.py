@@ -9,6 +9,26 @@ class Order(models.Model):
     robot_serial = models.CharField(max_length=5, blank=False, null=False)
     is_fulfilled = models.BooleanField(default=False)
     is_waiting = models.BooleanField(default=True)
+    # The robot reserved for, or allocated to, this order. The unique
+    # constraint keeps a robot from being handed to two orders.
+    robot = models.OneToOneField(
+        Robot,
+        on_delete=models.SET_NULL,
+        related_name='order',
+        blank=True,
+        null=True
+    )
+
+    class Meta:
+        indexes = [
+            # Only the waiting list is looked up by serial on every new robot;
+            # fulfilled orders, the bulk of the table, stay out of the index.
+            models.Index(
+                fields=['robot_serial'],
+                condition=models.Q(is_waiting=True),
+                name='order_waiting_serial_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} for {self.robot_serial}"
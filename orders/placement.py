@@ -0,0 +1,162 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, OuterRef
+
+from customers.models import Customer
+from robots.models import Robot
+from robots.stock import take_from_stock
+from robots.waiting_orders import waiting_orders
+from .models import Order
+
+
+class OrderValidationError(ValueError):
+    """Raised when an incoming order does not pass validation."""
+
+
+def validate_order_data(data):
+    """
+        Description:
+        ------------
+            Validate a decoded order and return its customer email and robot serial.
+
+        Parameters:
+        -----------
+            data (dict): The decoded JSON order, {"email", "robot_serial"}.
+
+        Returns:
+        --------
+            dict: "email" and "robot_serial".
+
+        Raises:
+        -------
+            OrderValidationError: With the message that is returned to the client.
+    """
+    if not isinstance(data, dict):
+        raise OrderValidationError("Invalid record format")
+
+    email = data.get('email')
+    robot_serial = data.get('robot_serial')
+
+    if not email or not robot_serial:
+        raise OrderValidationError("Missing required fields")
+
+    try:
+        validate_email(email)
+    except (TypeError, ValidationError):
+        raise OrderValidationError("Invalid email")
+
+    max_length = Order._meta.get_field('robot_serial').max_length
+    if not isinstance(robot_serial, str) or len(robot_serial) > max_length:
+        raise OrderValidationError("Invalid robot serial")
+
+    return {'email': email, 'robot_serial': robot_serial}
+
+
+def get_customers(emails):
+    """
+        Map emails to customers, creating the ones not seen before.
+
+        The missing customers are inserted in one query that skips emails a
+        concurrent request has inserted meanwhile, and are then read back, so
+        both requests end up with the same customer.
+    """
+    emails = set(emails)
+    customers = {customer.email: customer for customer in Customer.objects.filter(email__in=emails)}
+
+    missing = emails - customers.keys()
+    if missing:
+        Customer.objects.bulk_create([Customer(email=email) for email in missing], ignore_conflicts=True)
+        for customer in Customer.objects.filter(email__in=missing):
+            customers[customer.email] = customer
+
+    return customers
+
+
+def unreserved(robots):
+    """
+        Restrict a Robot queryset to the robots no order holds yet, oldest first.
+
+        The order check is a NOT EXISTS subquery on the unique Order.robot
+        index. Where the database supports it the rows are locked, skipping
+        rows another transaction has locked, so concurrent reservations and
+        allocations take different robots instead of queueing up behind each
+        other.
+    """
+    robots = robots.filter(~Exists(Order.objects.filter(robot=OuterRef('pk')))).order_by('id')
+    if connection.features.has_select_for_update:
+        robots = robots.select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+
+    return robots
+
+
+def in_stock_robots(serials):
+    """Robots of the given serials in stock, in one query over the serial index; see unreserved."""
+    return unreserved(Robot.objects.filter(serial__in=list(serials)))
+
+
+def place_orders(orders):
+    """
+        Description:
+        ------------
+            Place a batch of validated orders, reserving robots that are in stock.
+
+            In-stock robots for all the requested serials are read in one query
+            and handed to the orders in request order; the orders left without a
+            robot go on the waiting list. Everything is written in one
+            transaction. The unique constraint on Order.robot is what makes a
+            reservation safe: if a concurrent request took one of the robots
+            first, the transaction is rolled back and the batch is placed again
+            against the remaining stock, up to ORDERS_RESERVATION_ATTEMPTS times.
+
+        Parameters:
+        -----------
+            orders (list of dict): Output of validate_order_data.
+
+        Returns:
+        --------
+            list of Order: The created orders, in request order.
+    """
+    attempts = settings.ORDERS_RESERVATION_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        try:
+            with transaction.atomic():
+                return _place_orders(orders)
+        except IntegrityError:
+            if attempt == attempts:
+                raise
+
+
+def _place_orders(orders):
+    customers = get_customers([order['email'] for order in orders])
+
+    stock = {}
+    for robot in in_stock_robots({order['robot_serial'] for order in orders}):
+        stock.setdefault(robot.serial, []).append(robot)
+
+    placed = []
+    for order in orders:
+        available = stock.get(order['robot_serial'])
+        robot = available.pop(0) if available else None
+        placed.append(Order(
+            customer=customers[order['email']],
+            robot_serial=order['robot_serial'],
+            robot=robot,
+            is_waiting=robot is None,
+            is_fulfilled=robot is not None,
+        ))
+
+    Order.objects.bulk_create(placed)
+    take_from_stock(order.robot for order in placed if order.robot is not None)
+    # bulk_create sends no post_save, so the waiting list index is told here.
+    for order in placed:
+        if order.is_waiting:
+            waiting_orders.add(order.id, order.robot_serial)
+
+    return placed
+
+
+def place_order(order):
+    """Place a single validated order; see place_orders."""
+    return place_orders([order])[0]
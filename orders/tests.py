@@ -1,3 +1,148 @@
-from django.test import TestCase
+import json
+import threading
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from customers.models import Customer
+from orders.models import Order
+from orders.placement import get_customers, in_stock_robots
+from robots.models import Robot
+
+
+def create_robots(serial, count):
+    return [
+        Robot.objects.create(serial=serial, model=serial[:2], version=serial[2:], created=timezone.now())
+        for _ in range(count)
+    ]
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked against SQLite")
+class OrderQueryPlanTestCase(TestCase):
+
+    def test_waiting_orders_by_serial_use_partial_index(self):
+        orders = Order.objects.filter(robot_serial__in=['R2D2', '13XS'], is_waiting=True).select_related('customer')
+
+        self.assertIn("INDEX order_waiting_serial_idx", orders.explain())
+
+    def test_stock_lookup_uses_serial_index(self):
+        self.assertIn("INDEX robot_serial_idx", in_stock_robots(['R2D2']).explain())
+
+
+class CreateOrderTestCase(TestCase):
+
+    def post_order(self, data):
+        return self.client.post(reverse('create_order'), data=json.dumps(data), content_type='application/json')
+
+    def test_create_order_reserves_robot_in_stock(self):
+        robot, = create_robots('R2D2', 1)
+
+        response = self.post_order({'email': 'customer@example.com', 'robot_serial': 'R2D2'})
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['status'], body['robot_id']), ('reserved', robot.id))
+        order = Order.objects.get(id=body['id'])
+        self.assertTrue(order.is_fulfilled)
+        self.assertFalse(order.is_waiting)
+        self.assertEqual(order.customer.email, 'customer@example.com')
+
+    def test_create_order_waits_when_out_of_stock(self):
+        create_robots('R2D2', 1)
+        self.post_order({'email': 'first@example.com', 'robot_serial': 'R2D2'})
+
+        response = self.post_order({'email': 'second@example.com', 'robot_serial': 'R2D2'})
+
+        self.assertEqual(response.json()['status'], 'waiting')
+        self.assertIsNone(response.json()['robot_id'])
+        self.assertTrue(Order.objects.get(id=response.json()['id']).is_waiting)
+
+    def test_create_order_reuses_customer(self):
+        customer = Customer.objects.create(email='customer@example.com')
+
+        response = self.post_order({'email': 'customer@example.com', 'robot_serial': 'R2D2'})
+
+        self.assertEqual(Order.objects.get(id=response.json()['id']).customer, customer)
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_get_customers_creates_missing_customers_at_once(self):
+        customer = Customer.objects.create(email='a@example.com')
+
+        # The known customers, one insert for the missing ones, and those read back.
+        with self.assertNumQueries(3):
+            customers = get_customers(['a@example.com', 'b@example.com', 'c@example.com', 'b@example.com'])
+
+        self.assertEqual(customers['a@example.com'], customer)
+        self.assertEqual(set(customers), {'a@example.com', 'b@example.com', 'c@example.com'})
+        self.assertEqual(Customer.objects.count(), 3)
+        self.assertEqual(get_customers(['b@example.com']), {'b@example.com': customers['b@example.com']})
+
+    def test_create_order_validation(self):
+        for data, error in [
+            ({'robot_serial': 'R2D2'}, "Missing required fields"),
+            ({'email': 'not an email', 'robot_serial': 'R2D2'}, "Invalid email"),
+            ({'email': 'customer@example.com', 'robot_serial': 'R2D2XX'}, "Invalid robot serial"),
+        ]:
+            response = self.post_order(data)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], error)
+
+        self.assertEqual(self.client.get(reverse('create_order')).status_code, 405)
+        self.assertFalse(Order.objects.exists())
+
+    def test_create_orders_bulk(self):
+        create_robots('R2D2', 2)
+        data = [
+            {'email': 'a@example.com', 'robot_serial': 'R2D2'},
+            {'email': 'b@example.com'},
+            {'email': 'b@example.com', 'robot_serial': 'R2D2'},
+            {'email': 'a@example.com', 'robot_serial': 'R2D2'},
+            {'email': 'a@example.com', 'robot_serial': '13XS'},
+        ]
+
+        with self.assertNumQueries(10):
+            response = self.client.post(
+                reverse('create_orders_bulk'), data=json.dumps(data), content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['placed'], body['reserved'], body['rejected']), (4, 2, 1))
+        self.assertEqual(
+            [result.get('status') for result in body['results']],
+            ['reserved', None, 'reserved', 'waiting', 'waiting']
+        )
+        self.assertEqual(Customer.objects.count(), 2)
+
+
+class OrderReservationConcurrencyTestCase(TransactionTestCase):
+
+    def test_concurrent_orders_reserve_each_robot_once(self):
+        robots = create_robots('R2D2', 3)
+        barrier = threading.Barrier(8)
+        responses = []
+
+        def order(i):
+            try:
+                barrier.wait()
+                responses.append(self.client_class().post(
+                    reverse('create_order'),
+                    data=json.dumps({'email': f'customer{i}@example.com', 'robot_serial': 'R2D2'}),
+                    content_type='application/json'
+                ))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=order, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([response.status_code for response in responses], [201] * 8)
+        reserved = Order.objects.filter(robot__isnull=False)
+        self.assertEqual(sorted(reserved.values_list('robot_id', flat=True)), [robot.id for robot in robots])
+        self.assertEqual(Order.objects.filter(is_waiting=True).count(), 5)
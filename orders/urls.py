@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+
+urlpatterns = [
+    path('create/', views.create_order, name='create_order'),
+    path('create/bulk/', views.create_orders_bulk, name='create_orders_bulk'),
+]
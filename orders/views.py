@@ -1,3 +1,153 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.db import DatabaseError
+from django.views.decorators.csrf import csrf_exempt
 
-# Create your views here.
+from robots import codec
+from robots.codec import json_response
+from .placement import OrderValidationError, validate_order_data, place_order, place_orders
+
+
+def order_result(order):
+    return {
+        'id': order.id,
+        'robot_serial': order.robot_serial,
+        'status': 'waiting' if order.is_waiting else 'reserved',
+        'robot_id': order.robot_id,
+    }
+
+
+@csrf_exempt
+def create_order(req):
+    """
+        Description:
+        ------------
+            Place an order for a robot.
+
+            This view processes POST requests with a JSON payload of the
+            customer's email and the requested robot serial. The customer is
+            created on their first order. When a robot of that serial is in
+            stock it is reserved for the order straight away; otherwise the
+            order goes on the waiting list and is fulfilled when such a robot
+            is produced.
+
+        Parameters:
+        -----------
+        req (HttpRequest): The HTTP request object containing the POST data.
+
+        Returns:
+        --------
+        HttpResponse: A JSON response indicating the result of the operation.
+                      - On success, returns a 201 status with the order ID, its
+                        status ("reserved" or "waiting") and the reserved robot ID.
+                      - On failure, returns an appropriate error message and status code:
+                        - 400 for missing fields, invalid JSON, email or serial.
+                        - 405 if the request method is not POST.
+                        - 500 for database errors.
+    """
+    if req.method != "POST":
+        return json_response(
+            {'error': "Only POST method is allowed"},
+            status=405
+        )
+
+    try:
+        order_fields = validate_order_data(codec.loads(req.body))
+    except codec.DecodeError:
+        return json_response({"error": "Invalid JSON format"}, status=400)
+    except OrderValidationError as e:
+        return json_response({'error': str(e)}, status=400)
+
+    try:
+        order = place_order(order_fields)
+    except DatabaseError as e:
+        return json_response(
+            {"error": f"Database error: {str(e)}"},
+            status=500
+        )
+
+    return json_response(
+        {'message': "Order placed successfully", **order_result(order)},
+        status=201
+    )
+
+
+@csrf_exempt
+def create_orders_bulk(req):
+    """
+        Description:
+        ------------
+            Place a batch of orders given as a JSON array in a single request.
+
+            Every order is validated like in create_order. Valid orders are
+            matched against the stock with one query and written in one
+            transaction; invalid ones are reported and skipped.
+
+        Parameters:
+        -----------
+        req (HttpRequest): The HTTP request object containing the batch.
+
+        Returns:
+        --------
+        HttpResponse: A JSON response with per-order results.
+                      - 201 when at least one order was placed, 400 when none were.
+                        "results" holds {"index", "id", "robot_serial", "status",
+                        "robot_id"} for placed orders and {"index", "error"} for
+                        rejected ones.
+                      - 400 for a malformed body, 413 when the batch exceeds
+                        ORDERS_BULK_MAX_BATCH_SIZE orders.
+                      - 405 if the request method is not POST.
+                      - 500 for database errors; nothing is written in that case.
+    """
+    if req.method != "POST":
+        return json_response(
+            {'error': "Only POST method is allowed"},
+            status=405
+        )
+
+    try:
+        data = codec.loads(req.body)
+    except codec.DecodeError:
+        return json_response({"error": "Invalid JSON format"}, status=400)
+    if not isinstance(data, list):
+        return json_response({'error': "Expected a JSON array"}, status=400)
+
+    max_batch_size = settings.ORDERS_BULK_MAX_BATCH_SIZE
+    if len(data) > max_batch_size:
+        return json_response(
+            {'error': f"Batch size exceeds the limit of {max_batch_size} records"},
+            status=413
+        )
+
+    results = []
+    valid_fields = []
+    valid_results = []
+    for index, record in enumerate(data):
+        try:
+            valid_fields.append(validate_order_data(record))
+        except OrderValidationError as e:
+            results.append({'index': index, 'error': str(e)})
+        else:
+            result = {'index': index}
+            valid_results.append(result)
+            results.append(result)
+
+    try:
+        orders = place_orders(valid_fields) if valid_fields else []
+    except DatabaseError as e:
+        return json_response(
+            {"error": f"Database error: {str(e)}"},
+            status=500
+        )
+
+    for result, order in zip(valid_results, orders):
+        result.update(order_result(order))
+
+    return json_response(
+        {
+            'placed': len(orders),
+            'reserved': sum(not order.is_waiting for order in orders),
+            'rejected': len(results) - len(orders),
+            'results': results
+        },
+        status=201 if orders else 400
+    )
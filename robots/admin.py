@@ -1,3 +1,14 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import RobotModel, RobotVersion
+
+
+class RobotVersionInline(admin.TabularInline):
+    model = RobotVersion
+    extra = 1
+
+
+@admin.register(RobotModel)
+class RobotModelAdmin(admin.ModelAdmin):
+    list_display = ['code']
+    inlines = [RobotVersionInline]
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import RobotVersion
+
+
+class CatalogueCache:
+    """
+        In-process lookup table of the robot catalogue: (model, version) -> RobotVersion id.
+
+        The table is loaded with one query and kept until the catalogue changes.
+        Changes made in this process bump the generation through the model signals
+        and are picked up by the next lookup; changes made by other processes are
+        picked up once the table is older than ROBOTS_CATALOGUE_CACHE_TTL seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._loaded_generation = None
+        self._loaded_at = 0.0
+        self._versions = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+
+    def is_fresh(self):
+        return (
+            self._loaded_generation == self._generation
+            and time.monotonic() - self._loaded_at < settings.ROBOTS_CATALOGUE_CACHE_TTL
+        )
+
+    def reload(self):
+        with self._lock:
+            generation = self._generation
+        versions = {
+            (model, version): version_id
+            for version_id, model, version in RobotVersion.objects.values_list('id', 'model__code', 'code')
+        }
+        with self._lock:
+            self._versions = versions
+            self._loaded_generation = generation
+            self._loaded_at = time.monotonic()
+
+        return versions
+
+    def versions(self):
+        if self.is_fresh():
+            return self._versions
+        return self.reload()
+
+    async def aversions(self):
+        """versions() for async code: a reload runs in a worker thread."""
+        if self.is_fresh():
+            return self._versions
+        return await sync_to_async(self.reload)()
+
+
+catalogue_cache = CatalogueCache()
@@ -0,0 +1,52 @@
+"""
+JSON codec for the robots API.
+
+orjson or msgspec is used when installed, the standard library otherwise;
+ROBOTS_JSON_CODEC pins one explicitly. All codecs expose the same interface:
+loads() takes str or bytes, dumps() returns bytes, and decoding errors are
+instances of DecodeError.
+"""
+import json
+
+from django.conf import settings
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _stdlib_dumps(data):
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def _select_codec(name):
+    if name == 'auto':
+        name = 'orjson' if orjson else 'msgspec' if msgspec else 'json'
+
+    if name == 'orjson':
+        if orjson is None:
+            raise ImportError("ROBOTS_JSON_CODEC is 'orjson' but orjson is not installed")
+        return name, orjson.loads, orjson.dumps, orjson.JSONDecodeError
+    if name == 'msgspec':
+        if msgspec is None:
+            raise ImportError("ROBOTS_JSON_CODEC is 'msgspec' but msgspec is not installed")
+        return name, msgspec.json.Decoder().decode, msgspec.json.Encoder().encode, msgspec.DecodeError
+    if name == 'json':
+        return name, json.loads, _stdlib_dumps, json.JSONDecodeError
+
+    raise ValueError(f"Unknown ROBOTS_JSON_CODEC: {name}")
+
+
+CODEC, loads, dumps, DecodeError = _select_codec(settings.ROBOTS_JSON_CODEC)
+
+
+def json_response(data, status=200):
+    """A JSON HttpResponse serialised with the selected codec; a leaner JsonResponse."""
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
@@ -0,0 +1,127 @@
+from django.db import connection, transaction
+
+from orders.models import Order
+from orders.placement import unreserved
+from .models import Robot, RobotStock
+from .notifications import enqueue_robot_available_notifications
+from .stock import take_from_stock
+from .waiting_orders import waiting_orders
+
+
+def oldest_waiting_orders(serial, limit):
+    """The first `limit` orders on the waiting list for a serial, in the order they were placed."""
+    orders = Order.objects.filter(robot_serial=serial, is_waiting=True).select_related('customer').order_by('id')
+    if connection.features.has_select_for_update:
+        orders = orders.select_for_update(
+            skip_locked=connection.features.has_select_for_update_skip_locked,
+            of=('self',) if connection.features.has_select_for_update_of else (),
+        )
+
+    return list(orders[:limit])
+
+
+def fulfil_waiting_orders(robots):
+    """
+        Description:
+        ------------
+            Allocate newly created robots to the waiting orders, first come first served.
+
+            Every robot goes to at most one order: robots of a serial are handed,
+            oldest first, to the oldest orders waiting for that serial, with one
+            ordered query per serial limited to the number of robots. Serials that
+            the in-process waiting-order index knows have no waiting orders are
+            dropped without a query, and robots that an order placed in the
+            meantime has already reserved are left out. When the index is due
+            for a resync, robots in stock are first matched to the orders it
+            did not know were waiting (see match_stock_to_waiting_orders). In a single transaction
+            the orders are linked to their robots and marked fulfilled with one
+            bulk_update(), the robots are taken out of the stock counters and an
+            outbox notification is written for each order; the emails themselves
+            are sent later by the send_notifications command, so ingestion never
+            waits on SMTP. Robots left over stay in stock.
+
+            This is the one entry point for order fulfilment: the post_save signal
+            calls it for a single robot and the bulk ingestion paths, which bypass
+            post_save, call it once per batch.
+
+        Parameters:
+        -----------
+            robots (iterable of Robot): The newly created robots.
+
+        Returns:
+        --------
+            list of int: The ids of the orders that were fulfilled.
+    """
+    robots_by_serial = {}
+    for robot in robots:
+        robots_by_serial.setdefault(robot.serial, []).append(robot)
+
+    if not waiting_orders.is_fresh():
+        match_stock_to_waiting_orders()
+
+    serials = waiting_orders.waiting_serials(list(robots_by_serial))
+    if not serials:
+        return []
+
+    return allocate(robots_by_serial, serials)
+
+
+def match_stock_to_waiting_orders():
+    """
+        Description:
+        ------------
+            Allocate robots in stock to orders waiting for their serial.
+
+            The waiting-order index only knows the orders of its own process
+            until it is resynchronised, so a robot produced in the meantime for
+            an order another process put on the waiting list goes to stock.
+            This reloads the index and hands such robots, oldest first, to the
+            oldest waiting orders: one query on the stock counters for the
+            waiting serials, and one per serial that has both stock and waiting
+            orders, which is rare. fulfil_waiting_orders calls it whenever the
+            index is due for a resync, and repair_robot_stock calls it too.
+
+        Returns:
+        --------
+            list of int: The ids of the orders that were fulfilled.
+    """
+    waiting = {serial: len(order_ids) for serial, order_ids in waiting_orders.reload().items()}
+    stocked = list(
+        RobotStock.objects.filter(serial__in=list(waiting), count__gt=0).order_by('serial')
+        .values_list('serial', flat=True)
+    )
+    if not stocked:
+        return []
+
+    with transaction.atomic():
+        robots_by_serial = {
+            serial: list(unreserved(Robot.objects.filter(serial=serial))[:waiting[serial]]) for serial in stocked
+        }
+        return allocate(robots_by_serial, stocked)
+
+
+def allocate(robots_by_serial, serials):
+    """Allocate robots, serial -> robots oldest first, to the orders waiting for the given serials."""
+    with transaction.atomic():
+        free_robots = {}
+        robot_ids = [robot.id for serial in serials for robot in robots_by_serial[serial]]
+        for robot in unreserved(Robot.objects.filter(id__in=robot_ids)):
+            free_robots.setdefault(robot.serial, []).append(robot)
+
+        allocated = []
+        for serial, serial_robots in free_robots.items():
+            for order, robot in zip(oldest_waiting_orders(serial, len(serial_robots)), serial_robots):
+                order.robot = robot
+                order.is_waiting = False
+                order.is_fulfilled = True
+                allocated.append(order)
+
+        if not allocated:
+            return []
+
+        Order.objects.bulk_update(allocated, ['robot', 'is_waiting', 'is_fulfilled'])
+        take_from_stock(order.robot for order in allocated)
+        enqueue_robot_available_notifications(allocated)
+        waiting_orders.discard_on_commit((order.id, order.robot_serial) for order in allocated)
+
+    return [order.id for order in allocated]
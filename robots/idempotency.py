@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+
+class RecentKeys:
+    """
+        A bounded, thread-safe LRU map of recently used idempotency keys to robot ids.
+
+        It lets a retried request be answered without a database round-trip in
+        the common case; the unique constraint on Robot.idempotency_key remains
+        the source of truth for keys that have been evicted or were stored by
+        another process.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            robot_id = self._keys.get(key)
+            if robot_id is not None:
+                self._keys.move_to_end(key)
+            return robot_id
+
+    def add(self, key, robot_id):
+        with self._lock:
+            self._keys[key] = robot_id
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+    def __len__(self):
+        return len(self._keys)
+
+
+recent_keys = RecentKeys(settings.ROBOTS_IDEMPOTENCY_CACHE_SIZE)
+
+
+def remember_keys(pairs):
+    """
+        Add (key, robot id) pairs to the recent keys once the current transaction
+        commits, so that a rolled back robot is never reported as existing.
+    """
+    pairs = list(pairs)
+    if pairs:
+        transaction.on_commit(lambda: [recent_keys.add(key, robot_id) for key, robot_id in pairs])
+
+
+def derive_idempotency_key(serial, created):
+    """The key of a record sent without one: a robot is identified by its serial and production time."""
+    return f"{serial}:{created.isoformat()}"
@@ -0,0 +1,482 @@
+import csv
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import codec
+from .models import Robot
+from .catalogue import catalogue_cache
+from .fulfilment import fulfil_waiting_orders
+from .idempotency import recent_keys, remember_keys, derive_idempotency_key
+from .rollup import record_production
+from .stock import add_to_stock
+from .waiting_orders import waiting_orders
+
+
+logger = logging.getLogger(__name__)
+
+_fromisoformat = datetime.datetime.fromisoformat
+
+
+class RobotValidationError(ValueError):
+    """Raised when an incoming robot record does not pass validation."""
+
+
+def parse_created(value):
+    """
+        Parse the timestamp of a robot record.
+
+        Values as long as the documented "YYYY-MM-DD HH:MM:SS" format go
+        straight to the C implementation of datetime.fromisoformat; anything
+        else, and anything fromisoformat rejects, goes through parse_datetime.
+        The result is the same as parse_datetime's: None for unrecognised
+        formats and ValueError for well-formed but invalid values.
+    """
+    if len(value) == 19:
+        try:
+            return _fromisoformat(value)
+        except ValueError:
+            pass
+
+    return parse_datetime(value)
+
+
+def validate_robot_data(data, catalogue=None, tz=None):
+    """
+        Description:
+        ------------
+            Validate a decoded robot record and build the field values for a Robot.
+
+            These are the rules the create endpoint applies to its payload, shared
+            here so that every ingestion path accepts exactly the same records.
+            The model and version must be registered in the robot catalogue
+            (unless ROBOTS_VALIDATE_CATALOGUE is off); the check is a lookup in
+            the in-process catalogue cache, not a database query.
+
+            The record's idempotency key is its "idempotency_key" field or, when
+            that is absent, one derived from the serial and production time.
+
+        Parameters:
+        -----------
+            data (dict): The decoded JSON record.
+            catalogue (dict): A (model, version) -> RobotVersion id mapping to
+                              check against instead of the catalogue cache, for
+                              callers that must not touch the database.
+            tz (tzinfo): The time zone of timestamps without an offset, the
+                         current time zone by default.
+
+        Returns:
+        --------
+            dict: Keyword arguments for the Robot constructor.
+
+        Raises:
+        -------
+            RobotValidationError: With the message that is returned to the client.
+    """
+    if not isinstance(data, dict):
+        raise RobotValidationError("Invalid record format")
+
+    idempotency_key = data.get('idempotency_key')
+    if idempotency_key is not None and not is_valid_idempotency_key(idempotency_key):
+        raise RobotValidationError("Invalid idempotency key")
+
+    model = data.get('model')
+    version = data.get('version')
+    created_str = data.get('created')
+
+    if not model or not version or not created_str:
+        raise RobotValidationError("Missing required fields")
+
+    try:
+        created = parse_created(created_str)
+    except (TypeError, ValueError):
+        created = None
+    if not created:
+        raise RobotValidationError("Invalid date format")
+    if timezone.is_naive(created):
+        created = timezone.make_aware(created, tz)
+
+    if catalogue is None:
+        catalogue = catalogue_cache.versions()
+    robot_version_id = catalogue.get((model, version))
+    if robot_version_id is None and settings.ROBOTS_VALIDATE_CATALOGUE:
+        raise RobotValidationError("Unknown robot model or version")
+
+    serial = f"{model}{version}"
+
+    return {
+        'serial': serial,
+        'model': model,
+        'version': version,
+        'created': created,
+        'robot_version_id': robot_version_id,
+        'idempotency_key': idempotency_key or derive_idempotency_key(serial, created),
+    }
+
+
+def is_valid_idempotency_key(key):
+    return isinstance(key, str) and 0 < len(key) <= Robot._meta.get_field('idempotency_key').max_length
+
+
+def create_robot_once(robot_fields):
+    """
+        Description:
+        ------------
+            Create a robot unless one with the same idempotency key exists.
+
+            A retried request is recognised from the in-memory recent keys
+            without touching the database in the common case; otherwise the
+            unique constraint on the key rejects the duplicate and the original
+            robot is looked up.
+
+        Parameters:
+        -----------
+            robot_fields (dict): Output of validate_robot_data.
+
+        Returns:
+        --------
+            tuple: (robot id, whether the robot was created by this call).
+    """
+    key = robot_fields['idempotency_key']
+    robot_id = recent_keys.get(key)
+    if robot_id is not None:
+        return robot_id, False
+
+    try:
+        with transaction.atomic():
+            robot = Robot.objects.create(**robot_fields)
+    except IntegrityError:
+        robot_id = Robot.objects.filter(idempotency_key=key).values_list('id', flat=True).first()
+        if robot_id is None:
+            raise
+        remember_keys([(key, robot_id)])
+        return robot_id, False
+
+    remember_keys([(key, robot.id)])
+    return robot.id, True
+
+
+def find_existing_keys(keys, chunk_size=500):
+    """Map the given idempotency keys to robot ids: recent keys first, then the database in chunks."""
+    existing = {}
+    missing = []
+    for key in keys:
+        robot_id = recent_keys.get(key)
+        if robot_id is None:
+            missing.append(key)
+        else:
+            existing[key] = robot_id
+
+    for start in range(0, len(missing), chunk_size):
+        existing.update(
+            Robot.objects.filter(idempotency_key__in=missing[start:start + chunk_size])
+            .values_list('idempotency_key', 'id')
+        )
+
+    return existing
+
+
+def iter_ndjson(lines):
+    """
+        Decode an iterable of NDJSON lines.
+
+        Yields (line_number, record, error) tuples, where exactly one of record
+        and error is set. Blank lines are skipped but still counted. Text
+        streams decode as they are read, so a stream that is not valid UTF-8
+        ends with an error for the line it could not read.
+    """
+    line_number = 0
+    try:
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, codec.loads(line), None
+            except (codec.DecodeError, UnicodeDecodeError):
+                yield line_number, None, "Invalid JSON format"
+    except UnicodeDecodeError:
+        yield line_number + 1, None, "Invalid JSON format"
+
+
+def iter_csv(lines):
+    """
+        Decode an iterable of CSV lines with a header row.
+
+        The columns are those of the JSON records: "model", "version", "created"
+        and, optionally, "idempotency_key"; other columns are ignored and empty
+        cells count as missing. Yields the same (line_number, record, error)
+        tuples as iter_ndjson.
+    """
+    reader = csv.reader(line.decode() if isinstance(line, bytes) else line for line in lines)
+    try:
+        header = next(reader, [])
+        for row in reader:
+            if row:
+                yield reader.line_num, {field: value for field, value in zip(header, row) if value}, None
+    except (csv.Error, UnicodeDecodeError):
+        yield reader.line_num, None, "Invalid CSV format"
+
+
+# Columns written by insert_robots, after id.
+INSERT_FIELDS = ('serial', 'model', 'version', 'created', 'robot_version_id', 'idempotency_key')
+# Positional Robot() arguments are about twice as fast as keyword ones.
+ROBOT_ATTNAMES = [field.attname for field in Robot._meta.concrete_fields]
+
+
+def insert_robots(robots, chunk_size):
+    """
+        Description:
+        ------------
+            Insert new robots and set their ids.
+
+            On SQLite each chunk goes in with a single executemany() of a plain
+            INSERT, which skips the per-object, per-field preparation of
+            bulk_create and is several times faster on large batches. The ids
+            are read back as the top of the id range: the transaction holds
+            SQLite's only write lock from its first INSERT on, so the new rows
+            are the ones with the largest ids. Other databases use bulk_create,
+            which returns the ids.
+
+        Parameters:
+        -----------
+            robots (list of Robot): Unsaved robots, in a transaction.
+            chunk_size (int): Rows per INSERT.
+    """
+    if connection.vendor != 'sqlite':
+        Robot.objects.bulk_create(robots, batch_size=chunk_size)
+        return
+
+    table = Robot._meta.db_table
+    columns = ', '.join(connection.ops.quote_name(Robot._meta.get_field(name).column) for name in INSERT_FIELDS)
+    placeholders = ', '.join(['%s'] * len(INSERT_FIELDS))
+    sql = f"INSERT INTO {connection.ops.quote_name(table)} ({columns}) VALUES ({placeholders})"
+    # What adapt_datetimefield_value() does, without its per-call lookups.
+    db_timezone = connection.timezone if settings.USE_TZ else None
+
+    def adapt_datetime(value):
+        if db_timezone is not None and timezone.is_aware(value):
+            value = value.astimezone(db_timezone).replace(tzinfo=None)
+        return str(value)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(robots), chunk_size):
+            chunk = robots[start:start + chunk_size]
+            cursor.executemany(sql, [
+                (robot.serial, robot.model, robot.version, adapt_datetime(robot.created),
+                 robot.robot_version_id, robot.idempotency_key)
+                for robot in chunk
+            ])
+        if robots:
+            pk = connection.ops.quote_name(Robot._meta.pk.column)
+            cursor.execute(f"SELECT MAX({pk}) FROM {connection.ops.quote_name(table)}")
+            first_id = cursor.fetchone()[0] - len(robots) + 1
+            alias = connection.alias
+            for robot_id, robot in enumerate(robots, start=first_id):
+                robot.id = robot_id
+                robot._state.adding = False
+                robot._state.db = alias
+
+
+def bulk_create_robots(robot_fields, chunk_size=None, fulfil=True, remember=True):
+    """
+        Description:
+        ------------
+            Insert validated robots in chunks (insert_robots) in one transaction.
+
+            Records whose idempotency key is already stored, or repeats an earlier
+            record of the same batch, are not inserted again; they are reported
+            with the id of the original robot.
+
+            Bulk inserts do not send post_save, so what the signal does for a
+            single robot happens here once for the whole batch: the daily
+            production rollup and the stock counters are updated in the same
+            transaction, and the waiting orders the new robots satisfy are
+            fulfilled after it has committed.
+
+        Parameters:
+        -----------
+            robot_fields (iterable of dict): Output of validate_robot_data.
+            chunk_size (int): Rows per INSERT, ROBOTS_BULK_CHUNK_SIZE by default.
+            fulfil (bool): False to leave fulfilment to the caller.
+            remember (bool): False to keep the keys out of the recent-key
+                             cache, which only serves retried API requests.
+
+        Returns:
+        --------
+            list of tuple: (robot id, whether it was created) for every record, in order.
+    """
+    chunk_size = chunk_size or settings.ROBOTS_BULK_CHUNK_SIZE
+    robot_fields = list(robot_fields)
+
+    def new_robots_by_key(existing):
+        robots = {}
+        for fields in robot_fields:
+            key = fields['idempotency_key']
+            if key not in existing and key not in robots:
+                robots[key] = Robot(*[fields.get(attname) for attname in ROBOT_ATTNAMES])
+        return robots
+
+    with transaction.atomic():
+        existing = {}
+        for fields in robot_fields:
+            robot_id = recent_keys.get(fields['idempotency_key'])
+            if robot_id is not None:
+                existing[fields['idempotency_key']] = robot_id
+
+        # Batches of new robots, the common case, go in without a lookup of
+        # their keys; only when the unique constraint rejects one are the
+        # stored keys looked up and the batch inserted again without them.
+        robots = new_robots_by_key(existing)
+        try:
+            with transaction.atomic():
+                insert_robots(list(robots.values()), chunk_size)
+        except IntegrityError:
+            existing.update(find_existing_keys(list(robots), connection.features.max_query_params))
+            robots = new_robots_by_key(existing)
+            insert_robots(list(robots.values()), chunk_size)
+        new_robots = list(robots.values())
+
+        record_production(new_robots)
+        add_to_stock(new_robots)
+        if remember:
+            remember_keys((robot.idempotency_key, robot.id) for robot in new_robots)
+
+    if fulfil:
+        try:
+            fulfil_waiting_orders(new_robots)
+        except Exception:
+            # The robots are committed by now and stay in stock.
+            logger.exception("Fulfilment failed for %d new robots", len(new_robots))
+
+    results = []
+    for fields in robot_fields:
+        key = fields['idempotency_key']
+        robot = robots.pop(key, None)
+        if robot is not None:
+            results.append((robot.id, True))
+            existing[key] = robot.id
+        else:
+            results.append((existing[key], False))
+
+    return results
+
+
+def ingest_records(records, chunk_size=None, max_errors=None, bulk_load=False, progress=None):
+    """
+        Description:
+        ------------
+            Validate and store robots from decoded records without buffering them.
+
+            Valid robots are flushed to the database every chunk_size records,
+            each chunk in its own transaction, so memory use does not depend on
+            the number of records and already flushed chunks stay committed if a
+            later record or chunk fails.
+
+            A bulk load does not fulfil waiting orders chunk by chunk: the
+            orders that were waiting when it started are matched once at the
+            end, against at most as many new robots per serial as there are
+            orders waiting for it; orders placed in the meantime find the new
+            robots in stock. This also happens when a chunk fails or the load
+            is interrupted, for the robots of the chunks already committed.
+            Nor does it fill the recent-key cache, which only serves retried
+            API requests.
+
+        Parameters:
+        -----------
+            records (iterable): (line_number, record, error) tuples, as yielded
+                                by iter_ndjson and iter_csv.
+            chunk_size (int): Robots per flush, ROBOTS_STREAM_CHUNK_SIZE by default.
+            max_errors (int): Line errors to report in detail,
+                              ROBOTS_STREAM_MAX_ERRORS by default.
+            bulk_load (bool): Load for an import rather than an API request.
+            progress (callable): Called with the report after every flush.
+
+        Returns:
+        --------
+            dict: "accepted", "duplicates" (accepted records that were already
+                  stored) and "rejected" counts, "errors" as a list of
+                  {"line", "error"}, "errors_truncated", and "last_committed_line",
+                  the last line number covered by a committed chunk; for a bulk
+                  load, also "fulfilled", the number of orders fulfilled. When
+                  the database fails the ingestion is abandoned and "error" is set.
+    """
+    chunk_size = chunk_size or settings.ROBOTS_STREAM_CHUNK_SIZE
+    max_errors = settings.ROBOTS_STREAM_MAX_ERRORS if max_errors is None else max_errors
+
+    report = {
+        'accepted': 0,
+        'duplicates': 0,
+        'rejected': 0,
+        'errors': [],
+        'errors_truncated': False,
+        'last_committed_line': 0,
+    }
+    pending = []
+    last_line = 0
+    # Serial -> the number of new robots still to set aside for its waiting orders.
+    wanted = waiting_orders.waiting_counts() if bulk_load else {}
+    set_aside = []
+
+    def flush():
+        results = bulk_create_robots(pending, chunk_size, fulfil=not bulk_load, remember=not bulk_load)
+        report['accepted'] += len(results)
+        report['duplicates'] += sum(not created for robot_id, created in results)
+        report['last_committed_line'] = last_line
+        if wanted:
+            for fields, (robot_id, created) in zip(pending, results):
+                if created and wanted.get(fields['serial']):
+                    wanted[fields['serial']] -= 1
+                    set_aside.append(Robot(id=robot_id, **fields))
+        pending.clear()
+        if progress is not None:
+            progress(report)
+
+    try:
+        catalogue = catalogue_cache.versions()
+        tz = timezone.get_current_timezone()
+        for line_number, record, error in records:
+            last_line = line_number
+            if error is None:
+                try:
+                    pending.append(validate_robot_data(record, catalogue, tz))
+                except RobotValidationError as e:
+                    error = str(e)
+
+            if error is not None:
+                report['rejected'] += 1
+                if len(report['errors']) < max_errors:
+                    report['errors'].append({'line': line_number, 'error': error})
+                else:
+                    report['errors_truncated'] = True
+
+            if len(pending) >= chunk_size:
+                flush()
+
+        if pending:
+            flush()
+    except DatabaseError as e:
+        report['error'] = f"Database error: {str(e)}"
+    finally:
+        # Committed chunks stay whatever stopped the load, so their robots
+        # are matched against the waiting orders in any case.
+        if bulk_load:
+            try:
+                report['fulfilled'] = len(fulfil_waiting_orders(set_aside))
+            except DatabaseError as e:
+                report['fulfilled'] = 0
+                report.setdefault('error', f"Database error: {str(e)}")
+
+    return report
+
+
+def ingest_ndjson_stream(lines, chunk_size=None, max_errors=None):
+    """
+        Validate and store robots from an NDJSON stream without buffering it,
+        with ingest_records. Returns the ingest_records report.
+    """
+    return ingest_records(iter_ndjson(lines), chunk_size, max_errors)
@@ -0,0 +1,168 @@
+import base64
+import csv
+import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import codec
+from .models import Robot
+
+
+ROBOT_FIELDS = ['id', 'serial', 'model', 'version', 'created']
+
+
+class RobotQueryError(ValueError):
+    """Raised for listing or export parameters that cannot be honoured."""
+
+
+def parse_moment(value):
+    """A datetime or date query parameter as an aware datetime, a date meaning its midnight."""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = day and datetime.datetime.combine(day, datetime.time())
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise RobotQueryError("Invalid date format")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+
+    return moment
+
+
+def filter_robots(params):
+    """
+        Description:
+        ------------
+            The robots selected by listing or export query parameters.
+
+            "model" and "version" match exactly; "created_from" (inclusive) and
+            "created_to" (exclusive) bound the creation time and take ISO
+            datetimes or dates, in the default time zone unless they carry an
+            offset.
+
+        Parameters:
+        -----------
+            params (QueryDict): The query parameters.
+
+        Returns:
+        --------
+            QuerySet: The robots, ordered by creation time and id.
+
+        Raises:
+        -------
+            RobotQueryError: With the message that is returned to the client.
+    """
+    robots = Robot.objects.all()
+    for field in ('model', 'version'):
+        if params.get(field):
+            robots = robots.filter(**{field: params[field]})
+    if params.get('created_from'):
+        robots = robots.filter(created__gte=parse_moment(params['created_from']))
+    if params.get('created_to'):
+        robots = robots.filter(created__lt=parse_moment(params['created_to']))
+
+    return robots.order_by('created', 'id')
+
+
+def encode_cursor(created, robot_id):
+    return base64.urlsafe_b64encode(f"{created.isoformat()}|{robot_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created, robot_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.datetime.fromisoformat(created), int(robot_id)
+    except (ValueError, UnicodeError):
+        raise RobotQueryError("Invalid cursor")
+
+
+def after(robots, created, robot_id):
+    """
+        The robots after (created, robot_id) in (created, id) order.
+
+        The redundant created >= bound is what lets the database seek into the
+        created index instead of scanning it from the start for the OR.
+    """
+    return robots.filter(Q(created__gt=created) | Q(created=created, id__gt=robot_id), created__gte=created)
+
+
+def page_robots(robots, cursor=None, limit=None):
+    """
+        Description:
+        ------------
+            One page of robots, by keyset pagination on (created, id).
+
+            The page starts right after the robot the cursor points at, with a
+            range condition the created index answers directly, so a deep page
+            costs the same as the first one, unlike OFFSET, which reads and
+            discards every row before the page.
+
+        Parameters:
+        -----------
+            robots (QuerySet): Output of filter_robots.
+            cursor (str): The "next_cursor" of the previous page, None for the first.
+            limit (int): Robots per page, ROBOTS_LIST_PAGE_SIZE by default and
+                         at most ROBOTS_LIST_MAX_PAGE_SIZE.
+
+        Returns:
+        --------
+            tuple: (list of robot dicts, the cursor of the next page or None).
+    """
+    limit = min(limit or settings.ROBOTS_LIST_PAGE_SIZE, settings.ROBOTS_LIST_MAX_PAGE_SIZE)
+    if cursor:
+        robots = after(robots, *decode_cursor(cursor))
+
+    # One row more than the page tells whether there is a next page.
+    rows = list(robots.values(*ROBOT_FIELDS)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['created'], rows[-1]['id'])
+
+    return rows, next_cursor
+
+
+class Echo:
+    """A file-like object that hands back what is written to it, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def export_robots(robots, export_format='csv'):
+    """
+        Description:
+        ------------
+            Stream robots as CSV or NDJSON lines in constant memory.
+
+            The table is walked with a server-side cursor (iterator) over tuple
+            rows (values_list) fetched ROBOTS_EXPORT_CHUNK_SIZE at a time, so no
+            model instances are built and the whole result is never held.
+
+        Parameters:
+        -----------
+            robots (QuerySet): Output of filter_robots.
+            export_format (str): "csv" (with a header row) or "ndjson".
+
+        Yields:
+        -------
+            str or bytes: The lines of the export.
+    """
+    rows = robots.values_list(*ROBOT_FIELDS).iterator(chunk_size=settings.ROBOTS_EXPORT_CHUNK_SIZE)
+
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(ROBOT_FIELDS)
+        for row in rows:
+            yield writer.writerow(row[:-1] + (row[-1].isoformat(),))
+    else:
+        for row in rows:
+            record = dict(zip(ROBOT_FIELDS, row))
+            record['created'] = record['created'].isoformat()
+            yield codec.dumps(record) + b'\n'
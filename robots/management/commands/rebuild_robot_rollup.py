@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from robots.rollup import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily production rollup from the robots table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start_day', help="First day to rebuild, YYYY-MM-DD.")
+        parser.add_argument('--to', dest='end_day', help="Last day to rebuild, YYYY-MM-DD.")
+
+    def handle(self, *args, **options):
+        days = {}
+        for option in ('start_day', 'end_day'):
+            value = options[option]
+            try:
+                days[option] = parse_date(value) if value else None
+            except ValueError:
+                days[option] = None
+            if value and days[option] is None:
+                raise CommandError(f"Invalid date: {value}")
+
+        rows = rebuild_rollup(**days)
+
+        self.stdout.write(f"Rebuilt {rows} rollup rows")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from robots.fulfilment import match_stock_to_waiting_orders
+from robots.stock import repair_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-serial stock counters from the robots and orders tables, then allocate "
+        "robots in stock to orders waiting for their serial."
+    )
+
+    def handle(self, *args, **options):
+        corrections = repair_stock()
+
+        for serial, (stored, actual) in sorted(corrections.items()):
+            self.stdout.write(f"{serial}: {stored} -> {actual}")
+        self.stdout.write(f"Corrected {len(corrections)} stock counters")
+
+        fulfilled = match_stock_to_waiting_orders()
+        self.stdout.write(f"Fulfilled {len(fulfilled)} waiting orders from stock")
@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from robots.notifications import deliver_notifications, sender_stats
+
+
+class Command(BaseCommand):
+    help = "Send the pending notification emails from the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.NOTIFICATIONS_BATCH_SIZE,
+                            help="Notifications claimed per batch.")
+        parser.add_argument('--workers', type=int, default=settings.NOTIFICATIONS_WORKERS,
+                            help="Threads sending emails concurrently.")
+        parser.add_argument('--max-attempts', type=int, default=settings.NOTIFICATIONS_MAX_ATTEMPTS,
+                            help="Attempts before a notification is marked failed.")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling the outbox instead of exiting once it is drained.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep between polls of an empty outbox with --loop.")
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'retried': 0, 'failed': 0}
+
+        try:
+            while True:
+                stats = deliver_notifications(
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    max_attempts=options['max_attempts'],
+                )
+                for key, value in stats.items():
+                    totals[key] += value
+
+                if not any(stats.values()):
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        connection_stats = sender_stats()
+        self.stdout.write(
+            f"Sent: {totals['sent']}, retried: {totals['retried']}, failed: {totals['failed']}, "
+            f"connections: {connection_stats['connections']}, "
+            f"messages per connection: {connection_stats['messages_per_connection']:.1f}"
+        )
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:45
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_rollup(apps, schema_editor):
+    Robot = apps.get_model('robots', 'Robot')
+    RobotDailyCount = apps.get_model('robots', 'RobotDailyCount')
+
+    rows = Robot.objects.annotate(
+        day=TruncDate('created', tzinfo=timezone.get_default_timezone())
+    ).values('day', 'model', 'version').annotate(count=Count('id')).order_by()
+
+    RobotDailyCount.objects.bulk_create(
+        (RobotDailyCount(**row) for row in rows.iterator(chunk_size=2000)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('robots', '0003_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RobotDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('model', models.CharField(max_length=2)),
+                ('version', models.CharField(max_length=2)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'model', 'version'), name='unique_robot_daily_count')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('robots', '0004_robotdailycount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='robot',
+            index=models.Index(fields=['created'], name='robot_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='robot',
+            index=models.Index(fields=['model', 'version'], name='robot_model_version_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='robot',
+            index=models.Index(fields=['serial'], name='robot_serial_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_catalogue(apps, schema_editor):
+    """Register every model and version that robots were already produced for."""
+    Robot = apps.get_model('robots', 'Robot')
+    RobotModel = apps.get_model('robots', 'RobotModel')
+    RobotVersion = apps.get_model('robots', 'RobotVersion')
+
+    pairs = Robot.objects.values_list('model', 'version').distinct().order_by()
+    for model_code, version_code in pairs:
+        robot_model, _ = RobotModel.objects.get_or_create(code=model_code)
+        robot_version, _ = RobotVersion.objects.get_or_create(model=robot_model, code=version_code)
+        Robot.objects.filter(model=model_code, version=version_code).update(robot_version=robot_version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('robots', '0005_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RobotModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=2, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RobotVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=2)),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='robots.robotmodel')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='robot',
+            name='robot_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='robots', to='robots.robotversion'),
+        ),
+        migrations.AddConstraint(
+            model_name='robotversion',
+            constraint=models.UniqueConstraint(fields=('model', 'code'), name='unique_robot_version'),
+        ),
+        migrations.RunPython(populate_catalogue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:53
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_idempotency_keys(apps, schema_editor):
+    """
+        Give the robots stored before keys existed the key derive_idempotency_key
+        gives a retry of them, so that the retry is not stored twice. Of robots
+        that were already stored twice, the first keeps the key.
+    """
+    Robot = apps.get_model('robots', 'Robot')
+    tz = timezone.get_default_timezone()
+
+    last_id = 0
+    while True:
+        robots = list(
+            Robot.objects.filter(id__gt=last_id, idempotency_key__isnull=True)
+            .only('id', 'serial', 'created').order_by('id')[:1000]
+        )
+        if not robots:
+            break
+        last_id = robots[-1].id
+
+        keyed = {}
+        for robot in robots:
+            robot.idempotency_key = f"{robot.serial}:{timezone.localtime(robot.created, tz).isoformat()}"
+            keyed.setdefault(robot.idempotency_key, robot)
+        taken = set(Robot.objects.filter(idempotency_key__in=list(keyed)).values_list('idempotency_key', flat=True))
+
+        Robot.objects.bulk_update([robot for key, robot in keyed.items() if key not in taken], ['idempotency_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('robots', '0006_robot_catalogue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='robot',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_idempotency_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:01
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_stock(apps, schema_editor):
+    """
+        Count the robots no order holds. Orders 0006 has linked the orders
+        fulfilled before orders held robots to their robots.
+    """
+    Robot = apps.get_model('robots', 'Robot')
+    RobotStock = apps.get_model('robots', 'RobotStock')
+
+    rows = Robot.objects.filter(order__isnull=True).values('serial').annotate(count=Count('id')).order_by()
+
+    RobotStock.objects.bulk_create((RobotStock(**row) for row in rows.iterator(chunk_size=2000)), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('robots', '0007_robot_idempotency_key'),
+        ('orders', '0006_order_robot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RobotStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serial', models.CharField(max_length=5, unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_stock, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,29 @@
 from django.db import models
+from django.utils import timezone
+
+
+class RobotModel(models.Model):
+    """A robot model the company produces, e.g. R2."""
+
+    code = models.CharField(max_length=2, unique=True, blank=False, null=False)
+
+    def __str__(self):
+        return self.code
+
+
+class RobotVersion(models.Model):
+    """A version of a robot model, e.g. D2 of R2. Robots can only be registered for known versions."""
+
+    model = models.ForeignKey(RobotModel, on_delete=models.CASCADE, related_name='versions')
+    code = models.CharField(max_length=2, blank=False, null=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'code'], name='unique_robot_version'),
+        ]
+
+    def __str__(self):
+        return f"{self.model.code}-{self.code}"
 
 
 class Robot(models.Model):
@@ -6,6 +31,106 @@ class Robot(models.Model):
     model = models.CharField(max_length=2, blank=False, null=False)
     version = models.CharField(max_length=2, blank=False, null=False)
     created = models.DateTimeField(blank=False, null=False)
+    robot_version = models.ForeignKey(
+        RobotVersion,
+        on_delete=models.PROTECT,
+        related_name='robots',
+        blank=True,
+        null=True
+    )
+    idempotency_key = models.CharField(max_length=100, unique=True, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created'], name='robot_created_idx'),
+            models.Index(fields=['model', 'version'], name='robot_model_version_idx'),
+            models.Index(fields=['serial'], name='robot_serial_idx'),
+        ]
 
     def __str__(self):
         return f"{self.model} {self.version} {self.serial}"
+
+
+class Notification(models.Model):
+    """An email waiting in the outbox, delivered by the send_notifications command."""
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    order = models.ForeignKey('orders.Order', on_delete=models.CASCADE, related_name='notifications')
+    recipient = models.CharField(max_length=255, blank=False, null=False)
+    subject = models.CharField(max_length=255, blank=False, null=False)
+    message = models.TextField(blank=False, null=False)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notification #{self.id} to {self.recipient} ({self.status})"
+
+
+class RobotDailyCount(models.Model):
+    """Robots produced per day, model and version, maintained as robots are created."""
+
+    day = models.DateField(blank=False, null=False)
+    model = models.CharField(max_length=2, blank=False, null=False)
+    version = models.CharField(max_length=2, blank=False, null=False)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'model', 'version'], name='unique_robot_daily_count'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.model} {self.version}: {self.count}"
+
+
+class RobotStock(models.Model):
+    """Robots in stock per serial, i.e. produced but not held by any order, maintained as robots come and go."""
+
+    serial = models.CharField(max_length=5, unique=True, blank=False, null=False)
+    # Signed, unlike RobotDailyCount.count: adjust_stock applies unchecked F()
+    # updates, so a robot written to the database without going through the
+    # app, and never counted in, drives its counter below zero when an order
+    # takes it. A constraint would fail that order; current_stock ignores
+    # counts below zero instead, and repair_robot_stock corrects them.
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.serial}: {self.count}"
+
+
+class RobotDataVersion(models.Model):
+    """
+        The version of the production data, a single row. It advances in the
+        transaction that changes the data and keys the cached summaries and
+        their ETags in every process.
+    """
+
+    ID = 1
+
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    @property
+    def tag(self):
+        """The version in cache keys and ETags; the timestamp tells apart the versions of a database that was reset."""
+        return f"{self.version}.{int(self.changed_at.timestamp() * 1_000_000)}"
+
+    def __str__(self):
+        return f"{self.version} ({self.changed_at})"
@@ -0,0 +1,230 @@
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from R4C.metrics import timed
+
+from .models import Notification
+
+
+# Process-wide counters of the SMTP work done by deliver_notifications.
+_sender_stats = {'connections': 0, 'messages_sent': 0, 'messages_failed': 0}
+_sender_stats_lock = threading.Lock()
+
+
+def sender_stats():
+    """Return a snapshot of the sender counters, with the mean messages sent per connection."""
+    with _sender_stats_lock:
+        stats = dict(_sender_stats)
+    stats['messages_per_connection'] = (
+        stats['messages_sent'] / stats['connections'] if stats['connections'] else 0.0
+    )
+    return stats
+
+
+def _count(**increments):
+    with _sender_stats_lock:
+        for key, value in increments.items():
+            _sender_stats[key] += value
+
+
+def render_robot_available_email(robot):
+    subject = f"Робот {robot.model} {robot.version} теперь в наличии"
+    message = f"Добрый день!\n\nНедавно вы интересовались нашим роботом модели " \
+              f"{robot.model}, версии {robot.version}." \
+              f"\nЭтот робот теперь в наличии. " \
+              f"Если вам подходит этот вариант - пожалуйста, свяжитесь с нами."
+
+    return subject, message
+
+
+def enqueue_robot_available_notifications(orders):
+    """
+        Write an outbox entry for every order that a newly available robot,
+        order.robot, fulfils.
+
+        Call it inside the transaction that marks the orders fulfilled, so that
+        an order is never fulfilled without its notification or vice versa. The
+        message is rendered once per robot model and version, however many
+        orders wait for it.
+    """
+    rendered = {}
+    notifications = []
+    for order in orders:
+        robot = order.robot
+        key = (robot.model, robot.version)
+        if key not in rendered:
+            rendered[key] = render_robot_available_email(robot)
+        subject, message = rendered[key]
+        notifications.append(Notification(
+            order=order,
+            recipient=order.customer.email,
+            subject=subject,
+            message=message,
+        ))
+
+    return Notification.objects.bulk_create(notifications)
+
+
+def retry_delay(attempts):
+    """Exponential backoff before the next delivery attempt, capped by NOTIFICATIONS_RETRY_MAX_DELAY."""
+    delay = settings.NOTIFICATIONS_RETRY_BASE_DELAY * 2 ** (attempts - 1)
+    return datetime.timedelta(seconds=min(delay, settings.NOTIFICATIONS_RETRY_MAX_DELAY))
+
+
+def claim_due_notifications(batch_size):
+    """
+        Lease the next batch of due notifications to this worker.
+
+        The leased rows get next_attempt_at pushed NOTIFICATIONS_LEASE_SECONDS
+        into the future, so another worker does not pick them up while they are
+        being sent, and a worker that dies mid-batch only delays them. Where the
+        database supports it, rows locked by another worker are skipped.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = Notification.objects.filter(
+            status=Notification.PENDING,
+            next_attempt_at__lte=now
+        ).order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+
+        notifications = list(due[:batch_size])
+        Notification.objects.filter(id__in=[n.id for n in notifications]).update(
+            next_attempt_at=now + datetime.timedelta(seconds=settings.NOTIFICATIONS_LEASE_SECONDS)
+        )
+
+    return notifications
+
+
+def send_notifications_over_connection(notifications):
+    """
+        Send a chunk of outbox emails over a single mail connection.
+
+        The connection (and, for SMTP, its TLS handshake) is opened once and
+        reused for the whole chunk. After a failed message it is reopened, since
+        the server may have dropped it. When the connection cannot be opened,
+        the messages not yet sent fail with that error.
+
+        Returns the list of errors, None for every message that was sent; it
+        never raises, so that the caller can record every outcome.
+    """
+    errors = []
+    connection = get_connection()
+    connections = 0
+    is_open = False
+    try:
+        for notification in notifications:
+            if not is_open:
+                try:
+                    connection.open()
+                except Exception as e:
+                    errors.extend([e] * (len(notifications) - len(errors)))
+                    break
+                is_open = True
+                connections += 1
+
+            try:
+                message = EmailMessage(
+                    notification.subject,
+                    notification.message,
+                    settings.DEFAULT_FROM_EMAIL,
+                    [notification.recipient],
+                    connection=connection,
+                )
+                with timed('email'):
+                    connection.send_messages([message])
+            except Exception as e:
+                errors.append(e)
+                is_open = False
+                _close_quietly(connection)
+            else:
+                errors.append(None)
+    finally:
+        _close_quietly(connection)
+
+    failed = sum(error is not None for error in errors)
+    _count(connections=connections, messages_sent=len(errors) - failed, messages_failed=failed)
+
+    return errors
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+def deliver_notifications(batch_size=None, workers=None, max_attempts=None):
+    """
+        Description:
+        ------------
+            Send one batch of due outbox notifications.
+
+            The batch is split between the threads of a pool and every thread
+            sends its share over one reused mail connection, while all database
+            work stays on the calling thread. Failed notifications are
+            rescheduled with exponential backoff and marked failed once they have
+            used up max_attempts.
+
+        Parameters:
+        -----------
+            batch_size (int): Notifications per batch, NOTIFICATIONS_BATCH_SIZE by default.
+            workers (int): Sending threads, NOTIFICATIONS_WORKERS by default.
+            max_attempts (int): Attempts before giving up, NOTIFICATIONS_MAX_ATTEMPTS by default.
+
+        Returns:
+        --------
+            dict: Counts of "sent", "retried" and "failed" notifications.
+    """
+    batch_size = batch_size or settings.NOTIFICATIONS_BATCH_SIZE
+    workers = workers or settings.NOTIFICATIONS_WORKERS
+    max_attempts = max_attempts or settings.NOTIFICATIONS_MAX_ATTEMPTS
+
+    stats = {'sent': 0, 'retried': 0, 'failed': 0}
+    notifications = claim_due_notifications(batch_size)
+    if not notifications:
+        return stats
+
+    chunks = [notifications[i::workers] for i in range(min(workers, len(notifications)))]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        chunk_errors = list(executor.map(send_notifications_over_connection, chunks))
+
+    errors = [None] * len(notifications)
+    for i, chunk in enumerate(chunk_errors):
+        errors[i::len(chunks)] = chunk
+
+    now = timezone.now()
+    sent_ids = []
+    with transaction.atomic():
+        for notification, error in zip(notifications, errors):
+            if error is None:
+                sent_ids.append(notification.id)
+                continue
+
+            notification.attempts += 1
+            notification.last_error = str(error)
+            if notification.attempts >= max_attempts:
+                notification.status = Notification.FAILED
+                stats['failed'] += 1
+            else:
+                notification.next_attempt_at = now + retry_delay(notification.attempts)
+                stats['retried'] += 1
+            notification.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+        Notification.objects.filter(id__in=sent_ids).update(
+            status=Notification.SENT,
+            sent_at=now,
+            attempts=F('attempts') + 1,
+        )
+    stats['sent'] = len(sent_ids)
+
+    return stats
@@ -0,0 +1,96 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import RobotDataVersion
+
+
+def report_cache():
+    return caches[settings.ROBOTS_SUMMARY_CACHE_ALIAS]
+
+
+# The version of a database in which production data never changed.
+INITIAL_DATA_VERSION = RobotDataVersion(
+    id=RobotDataVersion.ID, version=0, changed_at=datetime.datetime.fromtimestamp(0, tz=datetime.timezone.utc)
+)
+
+
+def data_version():
+    """
+        The current version of the production data, a RobotDataVersion.
+
+        The version lives in the database, next to the data it describes, so
+        every process, and every management command that writes production
+        data, shares it. It only ever moves forward.
+    """
+    return RobotDataVersion.objects.filter(id=RobotDataVersion.ID).first() or INITIAL_DATA_VERSION
+
+
+async def adata_version():
+    """data_version for async code."""
+    return await RobotDataVersion.objects.filter(id=RobotDataVersion.ID).afirst() or INITIAL_DATA_VERSION
+
+
+def advance_data_version():
+    """
+        Invalidate the cached reports after production data changed.
+
+        Call it in the transaction that changes the data: the new version
+        becomes visible together with the change. A report is cached under the
+        version read before its rows, so it may hold newer data than its
+        version, never older. The version row stays locked until the
+        transaction ends, so on databases with row locks concurrent writers of
+        production data queue on it.
+    """
+    now = timezone.now()
+    versions = RobotDataVersion.objects.filter(id=RobotDataVersion.ID)
+    if versions.update(version=F('version') + 1, changed_at=now):
+        return
+    try:
+        with transaction.atomic():
+            RobotDataVersion.objects.create(id=RobotDataVersion.ID, version=1, changed_at=now)
+    except IntegrityError:
+        # Another writer inserted the row in the meantime.
+        versions.update(version=F('version') + 1, changed_at=now)
+
+
+def summary_cache_key(version, *parts):
+    return ':'.join(map(str, ['robots:summary', version, *parts]))
+
+
+def get_cached_report(version, *parts):
+    """
+        Return the cached bytes of a report, or None.
+
+        Read the version once, before rendering, and pass the same value to
+        cache_report: a report must be stored under the version of the data it
+        was rendered from, not one that advanced meanwhile.
+    """
+    return report_cache().get(summary_cache_key(version, *parts))
+
+
+async def aget_cached_report(version, *parts):
+    """get_cached_report for async code."""
+    return await report_cache().aget(summary_cache_key(version, *parts))
+
+
+def cache_report(content, version, *parts):
+    """Cache report bytes unless they exceed ROBOTS_SUMMARY_CACHE_MAX_BYTES. Returns whether they were cached."""
+    if len(content) > settings.ROBOTS_SUMMARY_CACHE_MAX_BYTES:
+        return False
+
+    report_cache().set(summary_cache_key(version, *parts), content)
+    return True
+
+
+async def acache_report(content, version, *parts):
+    """cache_report for async code."""
+    if len(content) > settings.ROBOTS_SUMMARY_CACHE_MAX_BYTES:
+        return False
+
+    await report_cache().aset(summary_cache_key(version, *parts), content)
+    return True
@@ -0,0 +1,204 @@
+import csv
+import datetime
+import io
+import tempfile
+from itertools import groupby
+
+from django.conf import settings
+
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+from R4C.metrics import timed
+
+from . import codec
+from .models import Robot, RobotDailyCount
+
+
+SUMMARY_HEADERS = ['Модель', 'Версия', 'Количество за неделю']
+PERIOD_SUMMARY_HEADERS = ['Модель', 'Версия', 'Период', 'Количество']
+RANGE_SUMMARY_HEADERS = ['Модель', 'Версия', 'Количество']
+
+# Period functions of the granularities a summary can be broken down by, for
+# the rollup's day column and for the robots' creation time in a time zone.
+ROLLUP_PERIODS = {
+    'day': lambda: F('day'),
+    'week': lambda: TruncWeek('day', output_field=DateField()),
+    'month': lambda: TruncMonth('day', output_field=DateField()),
+}
+ROBOT_PERIODS = {
+    'day': lambda tz: TruncDate('created', tzinfo=tz),
+    'week': lambda tz: TruncWeek('created', output_field=DateField(), tzinfo=tz),
+    'month': lambda tz: TruncMonth('created', output_field=DateField(), tzinfo=tz),
+}
+GRANULARITIES = ('total', *ROLLUP_PERIODS)
+
+
+def group_by_model(rows):
+    """
+        Turn (model, version, ..., count) rows ordered by model into
+        (model, [(version, ..., count), ...]) pairs.
+    """
+    return [
+        (model, [tuple(entry[1:]) for entry in entries])
+        for model, entries in groupby(rows, key=lambda row: row[0])
+    ]
+
+
+def summary_rows(start_day, end_day, tz=None, granularity='total'):
+    """
+        Description:
+        ------------
+            Production between two days, per model and version and optionally per period.
+
+            Days are calendar days in the time zone tz. In the project's default
+            time zone, which the daily rollup is kept in, the rollup is
+            aggregated; in any other time zone the robots themselves are, with
+            the day boundaries and periods computed by the database. Either way it
+            is one aggregate query.
+
+        Parameters:
+        -----------
+            start_day (date): First day of the range.
+            end_day (date): Last day of the range.
+            tz (tzinfo): Time zone of the days, the default time zone if None.
+            granularity (str): "total" for one row per version over the whole
+                               range, or "day", "week" or "month" for one row per
+                               version and period (the period's first day).
+
+        Returns:
+        --------
+            QuerySet: Dicts with "model", "version", "period" (unless the
+                      granularity is "total") and "count", ordered by model,
+                      version and period.
+    """
+    tz = tz or timezone.get_default_timezone()
+    if tz.key == timezone.get_default_timezone_name():
+        rows = RobotDailyCount.objects.filter(day__range=(start_day, end_day))
+        period = ROLLUP_PERIODS[granularity]() if granularity in ROLLUP_PERIODS else None
+        count = Sum('count')
+    else:
+        rows = Robot.objects.filter(
+            created__gte=datetime.datetime.combine(start_day, datetime.time(), tzinfo=tz),
+            created__lt=datetime.datetime.combine(end_day + datetime.timedelta(days=1), datetime.time(), tzinfo=tz),
+        )
+        period = ROBOT_PERIODS[granularity](tz) if granularity in ROBOT_PERIODS else None
+        count = Count('id')
+
+    fields = ['model', 'version']
+    if period is not None:
+        rows = rows.annotate(period=period)
+        fields.append('period')
+
+    return rows.values(*fields).annotate(count=count).order_by(*fields)
+
+
+def summary_headers(granularity, start_day, end_day):
+    if granularity != 'total':
+        return PERIOD_SUMMARY_HEADERS
+    if end_day - start_day == datetime.timedelta(days=6):
+        return SUMMARY_HEADERS
+    return RANGE_SUMMARY_HEADERS
+
+
+def column_widths(model, versions, headers=SUMMARY_HEADERS):
+    """Excel column widths for a model sheet, computed from the data rather than the cells."""
+    widths = [len(header) for header in headers]
+    widths[0] = max(widths[0], len(str(model)))
+    for entry in versions:
+        for col, value in enumerate(entry, start=1):
+            widths[col] = max(widths[col], len(str(value)))
+
+    return [width + 2 for width in widths]
+
+
+def build_summary_workbook(summary, write_only=False, headers=SUMMARY_HEADERS):
+    """
+        Description:
+        ------------
+            Build the summary workbook: one sheet per model, one row per version
+            (and period, for a summary broken down by period).
+
+            With write_only=True the sheets are openpyxl write-only worksheets:
+            rows are serialised as they are appended instead of being kept as
+            cell objects, so memory does not grow with the size of the report.
+            Such a workbook has no default sheet and can be saved only once.
+
+        Parameters:
+        -----------
+            summary (list): Output of group_by_model.
+            write_only (bool): Whether to build a write-only workbook.
+            headers (list): The header row of every sheet.
+
+        Returns:
+        --------
+            Workbook: The workbook, ready to be saved.
+    """
+    wb = Workbook(write_only=write_only)
+
+    for model, versions in summary:
+        ws = wb.create_sheet(title=model)
+
+        # Write-only sheets only accept column settings before the first row.
+        for col, width in enumerate(column_widths(model, versions, headers), start=1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+
+        ws.append(headers)
+
+        for entry in versions:
+            ws.append([model, *entry])
+
+        if write_only:
+            # Flush the finished sheet to its temporary file right away instead
+            # of keeping hundreds of open sheet writers around until save().
+            ws.close()
+
+    return wb
+
+
+def render_summary(summary, write_only=False, headers=SUMMARY_HEADERS):
+    """Build the summary workbook and save it into a spooled temporary file, see save_workbook_to_spooled_file."""
+    with timed('xlsx'):
+        return save_workbook_to_spooled_file(build_summary_workbook(summary, write_only=write_only, headers=headers))
+
+
+def summary_fields(granularity):
+    """The keys of the rows summary_rows returns for a granularity."""
+    return ['model', 'version', 'count'] if granularity == 'total' else ['model', 'version', 'period', 'count']
+
+
+def render_summary_csv(rows, granularity='total'):
+    """The rows of summary_rows as CSV bytes, with a header row."""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=summary_fields(granularity))
+    writer.writeheader()
+    writer.writerows(rows)
+
+    return out.getvalue().encode()
+
+
+def render_summary_json(rows, **meta):
+    """The rows of summary_rows as JSON bytes: the given metadata plus "rows", with periods as ISO dates."""
+    rows = [
+        {**row, 'period': row['period'].isoformat()} if 'period' in row else row
+        for row in rows
+    ]
+
+    return codec.dumps({**meta, 'rows': rows})
+
+
+def save_workbook_to_spooled_file(wb):
+    """
+        Save a workbook into a temporary file that stays in memory up to
+        ROBOTS_SUMMARY_SPOOL_MAX_SIZE bytes and rolls over to disk beyond that.
+
+        Returns the file rewound to its start, ready to be streamed.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=settings.ROBOTS_SUMMARY_SPOOL_MAX_SIZE)
+    wb.save(spooled)
+    spooled.seek(0)
+
+    return spooled
@@ -0,0 +1,112 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Robot, RobotDailyCount
+from .report_cache import advance_data_version
+
+
+def production_day(created):
+    """The production day of a robot, in the project's default time zone."""
+    if timezone.is_naive(created):
+        created = timezone.make_aware(created)
+    return timezone.localtime(created, timezone.get_default_timezone()).date()
+
+
+def add_count(day, model, version, count):
+    """Add to one rollup counter, creating it if needed."""
+    rows = RobotDailyCount.objects.filter(day=day, model=model, version=version)
+    if rows.update(count=F('count') + count):
+        return
+    try:
+        with transaction.atomic():
+            RobotDailyCount.objects.create(day=day, model=model, version=version, count=count)
+    except IntegrityError:
+        # Another writer inserted the row in the meantime.
+        rows.update(count=F('count') + count)
+
+
+def record_production(robots):
+    """
+        Description:
+        ------------
+            Add newly created robots to the daily production rollup.
+
+            The robots are counted per (day, model, version) in memory first, so
+            a batch costs one UPDATE per distinct key (plus one INSERT for all
+            the keys seen for the first time) however many robots it holds.
+            Counters are incremented with F() expressions, which keeps
+            concurrent writers from losing each other's updates. Cached reports
+            are invalidated.
+
+        Parameters:
+        -----------
+            robots (iterable of Robot): The newly created robots.
+    """
+    counts = Counter(
+        (production_day(robot.created), robot.model, robot.version) for robot in robots
+    )
+
+    with transaction.atomic():
+        new_keys = [
+            key for key, count in counts.items()
+            if not RobotDailyCount.objects.filter(day=key[0], model=key[1], version=key[2])
+            .update(count=F('count') + count)
+        ]
+        if new_keys:
+            try:
+                with transaction.atomic():
+                    RobotDailyCount.objects.bulk_create([
+                        RobotDailyCount(day=day, model=model, version=version, count=counts[day, model, version])
+                        for day, model, version in new_keys
+                    ])
+            except IntegrityError:
+                # Another writer inserted some of the rows in the meantime.
+                for day, model, version in new_keys:
+                    add_count(day, model, version, counts[day, model, version])
+
+        if counts:
+            advance_data_version()
+
+
+def rebuild_rollup(start_day=None, end_day=None):
+    """
+        Description:
+        ------------
+            Recompute the daily rollup from the Robot table.
+
+            Rollup rows in the range are replaced by a fresh aggregate of the
+            robots, so the command can both backfill history and repair drift.
+
+        Parameters:
+        -----------
+            start_day (date): First day to rebuild, or None for no lower bound.
+            end_day (date): Last day to rebuild, or None for no upper bound.
+
+        Returns:
+        --------
+            int: The number of rollup rows written.
+    """
+    robots = Robot.objects.annotate(day=TruncDate('created', tzinfo=timezone.get_default_timezone()))
+    rollup = RobotDailyCount.objects.all()
+    if start_day:
+        robots = robots.filter(day__gte=start_day)
+        rollup = rollup.filter(day__gte=start_day)
+    if end_day:
+        robots = robots.filter(day__lte=end_day)
+        rollup = rollup.filter(day__lte=end_day)
+
+    rows = robots.values('day', 'model', 'version').annotate(count=Count('id')).order_by()
+
+    with transaction.atomic():
+        rollup.delete()
+        created = RobotDailyCount.objects.bulk_create(
+            (RobotDailyCount(**row) for row in rows.iterator(chunk_size=2000)),
+            batch_size=1000,
+        )
+        advance_data_version()
+
+    return len(created)
@@ -1,9 +1,18 @@
-from django.db.models.signals import post_save
+import logging
+
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from .models import Robot
+from R4C.metrics import timed
 from orders.models import Order
-from R4C import settings
+from .models import Robot, RobotModel, RobotVersion
+from .catalogue import catalogue_cache
+from .waiting_orders import waiting_orders
+from .fulfilment import fulfil_waiting_orders
+from .rollup import record_production
+from .stock import add_to_stock
+
+
+logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Robot)
@@ -13,9 +22,10 @@ def notify_customers_when_robot_available(sender, instance, created, **kwargs):
         and updates the order status.
 
         This function is triggered after a Robot instance is saved. If the instance
-        is newly created, it checks for any orders waiting for this specific robot
-        and sends an email notification to the customers. It also updates the order
-        status to fulfilled.
+        is newly created, it is added to the daily production rollup and to the
+        stock counters, and handed to the fulfilment engine, which notifies the
+        customers whose orders wait for this specific robot and marks those
+        orders as fulfilled.
 
         Parameters:
         ----------
@@ -28,37 +38,42 @@ def notify_customers_when_robot_available(sender, instance, created, **kwargs):
         --------
             None
     """
-    if created:
+    if not created:
+        return
+
+    with timed('robot_post_save'):
+        record_production([instance])
+        add_to_stock([instance])
+
         try:
-            orders = Order.objects.filter(robot_serial=instance.serial, is_waiting=True)
-
-            for order in orders:
-                try:
-                    customer = order.customer
-
-                    send_email_to_customer(customer, instance)
-
-                    order.is_fulfilled = True
-                    order.is_waiting = False
-                    order.save()
-
-                except Exception as e:
-                    print(f"Error sending email to {order.customer}: {e}")
-                    order.refresh_from_db()
-        except Exception as e:
-            print(f"Error: {e}")
-
-
-def send_email_to_customer(customer, robot):
-    subject = f"Робот {robot.model} {robot.version} теперь в наличии"
-    message = f"Добрый день!\n\nНедавно вы интересовались нашим роботом модели " \
-              f"{robot.model}, версии {robot.version}." \
-              f"\nЭтот робот теперь в наличии. " \
-              f"Если вам подходит этот вариант - пожалуйста, свяжитесь с нами."
-
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [customer.email],
-    )
+            fulfil_waiting_orders([instance])
+        except Exception:
+            logger.exception("Fulfilment failed for robot %s", instance.serial)
+
+
+@receiver([post_save, post_delete], sender=RobotModel)
+@receiver([post_save, post_delete], sender=RobotVersion)
+def invalidate_robot_catalogue(sender, **kwargs):
+    """
+        Drops the cached robot catalogue whenever a model or version is added,
+        changed or removed, so that the next validation reloads it.
+    """
+    catalogue_cache.invalidate()
+
+
+@receiver(post_save, sender=Order)
+def index_waiting_order(sender, instance, **kwargs):
+    """
+        Keeps the waiting-order index in step with a saved order: a waiting
+        order is indexed at once, one taken off the waiting list is removed
+        when the transaction commits.
+    """
+    if instance.is_waiting:
+        waiting_orders.add(instance.id, instance.robot_serial)
+    else:
+        waiting_orders.discard_on_commit([(instance.id, instance.robot_serial)])
+
+
+@receiver(post_delete, sender=Order)
+def unindex_deleted_order(sender, instance, **kwargs):
+    waiting_orders.discard_on_commit([(instance.id, instance.robot_serial)])
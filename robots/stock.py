@@ -0,0 +1,81 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Robot, RobotStock
+
+
+def adjust_stock(changes):
+    """
+        Description:
+        ------------
+            Apply per-serial changes to the stock counters.
+
+            Counters are changed with F() expressions, one UPDATE per serial
+            (plus one INSERT for a serial seen for the first time), so concurrent
+            writers never lose each other's changes.
+
+        Parameters:
+        -----------
+            changes (dict): serial -> number of robots added (or, negative, taken).
+    """
+    with transaction.atomic():
+        for serial, change in changes.items():
+            if not change:
+                continue
+            rows = RobotStock.objects.filter(serial=serial)
+            if rows.update(count=F('count') + change):
+                continue
+            try:
+                with transaction.atomic():
+                    RobotStock.objects.create(serial=serial, count=change)
+            except IntegrityError:
+                # Another writer inserted the row in the meantime.
+                rows.update(count=F('count') + change)
+
+
+def add_to_stock(robots):
+    """Count newly produced robots into stock."""
+    adjust_stock(Counter(robot.serial for robot in robots))
+
+
+def take_from_stock(robots):
+    """Take robots that were reserved for, or allocated to, orders out of stock."""
+    adjust_stock({serial: -count for serial, count in Counter(robot.serial for robot in robots).items()})
+
+
+def current_stock():
+    """Robots in stock per serial, as {serial: count}, for the serials that have any."""
+    return dict(RobotStock.objects.filter(count__gt=0).order_by('serial').values_list('serial', 'count'))
+
+
+def repair_stock():
+    """
+        Description:
+        ------------
+            Recompute the stock counters from the Robot and Order tables.
+
+            A robot is in stock while no order holds it. Counters that differ
+            from the recomputed values are corrected, and counters of serials
+            without stock are set to zero.
+
+        Returns:
+        --------
+            dict: serial -> (stored count, actual count) for every corrected counter.
+    """
+    with transaction.atomic():
+        actual = dict(
+            Robot.objects.filter(order__isnull=True).values('serial').annotate(count=Count('id'))
+            .order_by().values_list('serial', 'count')
+        )
+        stored = dict(RobotStock.objects.select_for_update().values_list('serial', 'count'))
+
+        corrections = {
+            serial: (stored.get(serial, 0), actual.get(serial, 0))
+            for serial in set(actual) | set(stored)
+            if stored.get(serial, 0) != actual.get(serial, 0)
+        }
+        adjust_stock({serial: counts[1] - counts[0] for serial, counts in corrections.items()})
+
+    return corrections
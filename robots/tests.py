@@ -1,17 +1,39 @@
-from django.db import DatabaseError
-from django.test import TestCase
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count
+from django.http import QueryDict
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
+from unittest import skipUnless
 from unittest.mock import patch
+import datetime
 import json
+import time
 
 import io
+import os
+import tempfile
 from openpyxl import Workbook, load_workbook
 
 from customers.models import Customer
-from robots.models import Robot
+from robots.models import Robot, Notification, RobotDailyCount, RobotModel, RobotVersion, RobotStock
 from orders.models import Order
 from robots.signals import notify_customers_when_robot_available
+from robots.fulfilment import fulfil_waiting_orders
+from robots import codec, ingest
+from robots.codec import json_response
+from robots.ingest import RobotValidationError, validate_robot_data, parse_created
+from robots.report_cache import report_cache
+from robots.notifications import deliver_notifications, sender_stats, render_robot_available_email
+from robots.idempotency import recent_keys
+from robots.waiting_orders import waiting_orders
+from robots.stock import add_to_stock, current_stock, repair_stock
+from robots.listing import filter_robots, after, encode_cursor
+from robots.rollup import rebuild_rollup
+from robots.catalogue import catalogue_cache
 
 
 def load_workbook_from_response(response):
@@ -34,8 +56,19 @@ def check_data_rows(ws, expected_data):
         assert ws.cell(row=row, column=3).value == count
 
 
+def add_to_catalogue(*pairs):
+    """Register (model, version) pairs in the robot catalogue."""
+    for model_code, version_code in pairs:
+        robot_model, _ = RobotModel.objects.get_or_create(code=model_code)
+        RobotVersion.objects.get_or_create(model=robot_model, code=version_code)
+
+
 class CreateRobotTestCase(TestCase):
 
+    def setUp(self):
+        report_cache().clear()
+        add_to_catalogue(('XR', '10'))
+
     def test_create_robot_success(self):
         url = reverse('create_robot')
         data = {
@@ -167,26 +200,1256 @@ class CreateRobotTestCase(TestCase):
         check_data_rows(ws1, [('R2', '10', 1)])
         check_data_rows(ws2, [('R3', '10', 1)])
 
+    def test_generate_robot_summary_single_query(self):
+        url = reverse('download_robots_summary')
+        for model in ('R2', 'R3', 'X5'):
+            for version in ('10', 'D2'):
+                Robot.objects.create(model=model, version=version, created=timezone.now())
+
+        # The data version and the aggregate.
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        wb = load_workbook(io.BytesIO(response.content))
+        self.assertEqual(wb.sheetnames, ['Sheet', 'R2', 'R3', 'X5'])
+        check_data_rows(wb['X5'], [('X5', '10', 1), ('X5', 'D2', 1)])
+        self.assertEqual(wb['X5'].column_dimensions['C'].width, len('Количество за неделю') + 2)
+
+    def test_generate_robot_summary_streamed_write_only(self):
+        url = reverse('download_robots_summary')
+        Robot.objects.create(model='R2', version='10', created=timezone.now())
+        Robot.objects.create(model='R3', version='10', created=timezone.now())
+        Robot.objects.create(model='R3', version='10', created=timezone.now())
+
+        response = self.client.get(url, {'stream': '1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('robot_summary_last_week.xlsx', response['Content-Disposition'])
+        wb = load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(wb.sheetnames, ['R2', 'R3'])
+        check_workbook_headers(wb['R3'])
+        check_data_rows(wb['R3'], [('R3', '10', 2)])
+
     def test_notify_customers_when_robot_available_no_serial(self):
         robot = Robot.objects.create(model='XR', version='10', created=timezone.now(), serial='XR10')
+        waiting_orders.reload()
 
         with patch('orders.models.Order.objects.filter') as mock_filter:
             mock_filter.return_value = Order.objects.none()
 
             notify_customers_when_robot_available(Robot, robot, created=True)
 
-            mock_filter.assert_called_once_with(robot_serial='XR10', is_waiting=True)
+            mock_filter.assert_not_called()
 
-    def test_notify_customers_when_robot_available_email_failure(self):
+    def test_notify_customers_when_robot_available_queues_notification(self):
         customer = Customer.objects.create(email='customer@example.com')
-        robot = Robot.objects.create(model='XR', version='10', created=timezone.now(), serial='XR10')
         order = Order.objects.create(robot_serial='XR10', is_waiting=True, customer=customer)
+        robot = Robot.objects.create(model='XR', version='10', created=timezone.now(), serial='XR10')
 
-        with patch('robots.signals.send_email_to_customer',
-                   side_effect=Exception("Email sending failed")) as mock_send_email:
-            notify_customers_when_robot_available(Robot, robot, created=True)
+        order.refresh_from_db()
+        self.assertTrue(order.is_fulfilled)
+        self.assertFalse(order.is_waiting)
+        self.assertEqual(len(mail.outbox), 0)
+
+        notification = Notification.objects.get(order=order)
+        self.assertEqual(notification.recipient, 'customer@example.com')
+        self.assertEqual(notification.status, Notification.PENDING)
+        self.assertIn(f"модели {robot.model}, версии {robot.version}", notification.message)
+
+
+class CreateRobotsBulkTestCase(TestCase):
+
+    def setUp(self):
+        add_to_catalogue(('R2', 'D2'), ('R2', 'D3'), ('13', 'XS'), ('X5', 'LT'))
+
+    def test_create_robots_bulk_json_array(self):
+        url = reverse('create_robots_bulk')
+        data = [
+            {"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"},
+            {"version": "D2", "created": "2024-12-12 10:00:00"},
+            {"model": "X5", "version": "LT", "created": "not a date"},
+            {"model": "13", "version": "XS", "created": "2024-12-12 10:00:01"},
+        ]
+        response = self.client.post(url, data=json.dumps(data), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body['created'], 2)
+        self.assertEqual(body['rejected'], 2)
+        self.assertEqual(body['results'][1], {'index': 1, 'error': 'Missing required fields'})
+        self.assertEqual(body['results'][2], {'index': 2, 'error': 'Invalid date format'})
+
+        robot = Robot.objects.get(id=body['results'][0]['id'])
+        self.assertEqual(robot.serial, 'R2D2')
+        self.assertEqual(Robot.objects.get(id=body['results'][3]['id']).serial, '13XS')
+
+    def test_create_robots_bulk_ndjson(self):
+        url = reverse('create_robots_bulk')
+        data = (
+            '{"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}\n'
+            '\n'
+            '{model: R2}\n'
+            '{"model": "R2", "version": "D3", "created": "2024-12-12 10:00:00"}\n'
+        )
+        response = self.client.post(url, data=data, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body['created'], 2)
+        self.assertEqual([result['index'] for result in body['results']], [1, 3, 4])
+        self.assertEqual(body['results'][1]['error'], 'Invalid JSON format')
+        self.assertEqual(Robot.objects.count(), 2)
+
+    def test_create_robots_bulk_no_valid_records(self):
+        url = reverse('create_robots_bulk')
+        response = self.client.post(url, data=json.dumps([{"model": "R2"}]), content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], 0)
+
+    def test_create_robots_bulk_expects_array(self):
+        url = reverse('create_robots_bulk')
+        data = {"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}
+        response = self.client.post(url, data=json.dumps(data), content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Expected a JSON array')
+
+    @override_settings(ROBOTS_BULK_MAX_BATCH_SIZE=2)
+    def test_create_robots_bulk_too_large(self):
+        url = reverse('create_robots_bulk')
+        data = [{"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}] * 3
+        response = self.client.post(url, data=json.dumps(data), content_type='application/json')
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Robot.objects.exists())
+
+    def test_create_robots_bulk_database_error(self):
+        url = reverse('create_robots_bulk')
+        data = [{"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}]
+
+        with patch('robots.ingest.insert_robots', side_effect=DatabaseError("Database is down")):
+            response = self.client.post(url, data=json.dumps(data), content_type='application/json')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['error'], "Database error: Database is down")
+
+
+def ndjson_lines(count, start=0):
+    return ''.join(
+        json.dumps({"model": "R2", "version": f"{i % 100:02d}", "created": "2024-12-12 10:00:00"}) + '\n'
+        for i in range(start, start + count)
+    )
+
+
+class CreateRobotsStreamTestCase(TestCase):
+
+    def setUp(self):
+        add_to_catalogue(*[('R2', f"{i:02d}") for i in range(10)])
+
+    @override_settings(ROBOTS_STREAM_CHUNK_SIZE=2)
+    def test_create_robots_stream_reports_line_errors(self):
+        url = reverse('create_robots_stream')
+        data = ndjson_lines(3) + '{"model": "R2"}\nnot json\n' + ndjson_lines(2, start=3)
+        response = self.client.post(url, data=data, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['accepted'], 5)
+        self.assertEqual(body['rejected'], 2)
+        self.assertEqual(body['errors'], [
+            {'line': 4, 'error': 'Missing required fields'},
+            {'line': 5, 'error': 'Invalid JSON format'},
+        ])
+        self.assertEqual(body['last_committed_line'], 7)
+        self.assertEqual(Robot.objects.count(), 5)
+
+    @override_settings(ROBOTS_STREAM_MAX_ERRORS=1)
+    def test_create_robots_stream_truncates_errors(self):
+        url = reverse('create_robots_stream')
+        response = self.client.post(url, data='x\ny\nz\n', content_type='application/x-ndjson')
+
+        body = response.json()
+        self.assertEqual(body['rejected'], 3)
+        self.assertEqual(len(body['errors']), 1)
+        self.assertTrue(body['errors_truncated'])
+
+    @override_settings(ROBOTS_STREAM_CHUNK_SIZE=2)
+    def test_create_robots_stream_keeps_committed_chunks_on_database_error(self):
+        url = reverse('create_robots_stream')
+        insert_robots = ingest.insert_robots
+        calls = []
+
+        def failing_insert_robots(*args, **kwargs):
+            calls.append(1)
+            if len(calls) > 1:
+                raise DatabaseError("Database is down")
+            return insert_robots(*args, **kwargs)
+
+        with patch('robots.ingest.insert_robots', side_effect=failing_insert_robots):
+            response = self.client.post(url, data=ndjson_lines(5), content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 500)
+        body = response.json()
+        self.assertEqual(body['error'], "Database error: Database is down")
+        self.assertEqual(body['accepted'], 2)
+        self.assertEqual(body['last_committed_line'], 2)
+        self.assertEqual(Robot.objects.count(), 2)
+
+
+class FulfilmentTestCase(TestCase):
+
+    def setUp(self):
+        add_to_catalogue(('R2', 'D2'))
+        self.customers = [Customer.objects.create(email=f'customer{i}@example.com') for i in range(3)]
+
+    def test_fulfil_waiting_orders_batches_queries(self):
+        for customer in self.customers:
+            Order.objects.create(robot_serial='R2D2', customer=customer)
+            Order.objects.create(robot_serial='13XS', customer=customer)
+        other = Order.objects.create(robot_serial='X5LT', customer=self.customers[0])
+        robots = Robot.objects.bulk_create(
+            [Robot(serial='R2D2', model='R2', version='D2', created=timezone.now()) for _ in range(3)]
+            + [Robot(serial='13XS', model='13', version='XS', created=timezone.now()) for _ in range(3)]
+        )
+        add_to_stock(robots)
+        waiting_orders.reload()
+
+        # The free robots, one ordered query per serial, one bulk update, one
+        # stock update per serial and one insert of notifications, plus savepoints.
+        with self.assertNumQueries(11):
+            fulfilled = fulfil_waiting_orders(robots)
+
+        self.assertEqual(len(fulfilled), 6)
+        self.assertEqual(Notification.objects.count(), 6)
+        self.assertEqual(Order.objects.filter(is_waiting=False, is_fulfilled=True).count(), 6)
+        other.refresh_from_db()
+        self.assertTrue(other.is_waiting)
+
+    def test_robots_go_to_oldest_orders_first(self):
+        orders = [Order.objects.create(robot_serial='R2D2', customer=customer) for customer in self.customers]
+        robots = Robot.objects.bulk_create(
+            [Robot(serial='R2D2', model='R2', version='D2', created=timezone.now()) for _ in range(2)]
+        )
+
+        fulfilled = fulfil_waiting_orders(robots)
+
+        self.assertEqual(fulfilled, [orders[0].id, orders[1].id])
+        for order in orders:
+            order.refresh_from_db()
+        self.assertEqual([order.robot_id for order in orders], [robots[0].id, robots[1].id, None])
+        self.assertTrue(orders[2].is_waiting)
+        self.assertEqual(fulfil_waiting_orders(robots), [])
+
+        robot = Robot.objects.create(serial='R2D2', model='R2', version='D2', created=timezone.now())
+        orders[2].refresh_from_db()
+        self.assertEqual(orders[2].robot, robot)
+
+    def test_reserved_robot_is_not_allocated_again(self):
+        robot = Robot.objects.bulk_create([Robot(serial='R2D2', model='R2', version='D2', created=timezone.now())])[0]
+        Order.objects.create(robot_serial='R2D2', customer=self.customers[0], robot=robot,
+                             is_waiting=False, is_fulfilled=True)
+        waiting = Order.objects.create(robot_serial='R2D2', customer=self.customers[1])
+
+        self.assertEqual(fulfil_waiting_orders([robot]), [])
+        waiting.refresh_from_db()
+        self.assertTrue(waiting.is_waiting)
+
+    def test_bulk_ingestion_fulfils_waiting_orders(self):
+        order = Order.objects.create(robot_serial='R2D2', customer=self.customers[0])
+        data = [{"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}]
+
+        self.client.post(reverse('create_robots_bulk'), data=json.dumps(data), content_type='application/json')
+
+        order.refresh_from_db()
+        self.assertTrue(order.is_fulfilled)
+        self.assertFalse(order.is_waiting)
+        self.assertEqual(Notification.objects.get().recipient, 'customer0@example.com')
+
+    def test_bulk_ingestion_logs_fulfilment_failure(self):
+        data = [{"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}]
+
+        with patch('robots.ingest.fulfil_waiting_orders', side_effect=DatabaseError("boom")), \
+                self.assertLogs('robots.ingest', 'ERROR') as logs:
+            response = self.client.post(reverse('create_robots_bulk'), data=json.dumps(data),
+                                        content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Robot.objects.count(), 1)
+        self.assertIn("Fulfilment failed for 1 new robots", logs.output[0])
+
+
+class NotificationDeliveryTestCase(TestCase):
+
+    def setUp(self):
+        customer = Customer.objects.create(email='customer@example.com')
+        self.orders = [Order.objects.create(robot_serial='R2D2', customer=customer) for _ in range(3)]
+        self.robots = [
+            Robot.objects.create(serial='R2D2', model='R2', version='D2', created=timezone.now()) for _ in range(3)
+        ]
+
+    def test_deliver_notifications_sends_outbox(self):
+        stats = deliver_notifications(workers=2)
+
+        self.assertEqual(stats, {'sent': 3, 'retried': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].subject, "Робот R2 D2 теперь в наличии")
+        self.assertFalse(Notification.objects.exclude(status=Notification.SENT).exists())
+        self.assertEqual(deliver_notifications(), {'sent': 0, 'retried': 0, 'failed': 0})
+
+    @override_settings(NOTIFICATIONS_RETRY_BASE_DELAY=10)
+    def test_deliver_notifications_retries_with_backoff(self):
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=Exception("SMTP is down")):
+            stats = deliver_notifications(max_attempts=2)
+
+        self.assertEqual(stats, {'sent': 0, 'retried': 3, 'failed': 0})
+        notification = Notification.objects.first()
+        self.assertEqual(notification.attempts, 1)
+        self.assertEqual(notification.last_error, "SMTP is down")
+        delay = (notification.next_attempt_at - timezone.now()).total_seconds()
+        self.assertTrue(5 < delay <= 10)
+
+        # Not due yet: nothing is claimed until the backoff has passed.
+        self.assertEqual(deliver_notifications(), {'sent': 0, 'retried': 0, 'failed': 0})
+
+        Notification.objects.update(next_attempt_at=timezone.now())
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=Exception("SMTP is down")):
+            stats = deliver_notifications(max_attempts=2)
+
+        self.assertEqual(stats, {'sent': 0, 'retried': 0, 'failed': 3})
+        self.assertEqual(Notification.objects.filter(status=Notification.FAILED).count(), 3)
+
+    def test_deliver_notifications_records_connection_failures(self):
+        with patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=OSError("Connection refused")):
+            stats = deliver_notifications(workers=2)
+
+        self.assertEqual(stats, {'sent': 0, 'retried': 3, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            list(Notification.objects.values_list('attempts', 'last_error').distinct()), [(1, "Connection refused")]
+        )
+
+    def test_deliver_notifications_keeps_messages_sent_before_reconnect_fails(self):
+        send_messages = get_connection().__class__.send_messages
+        calls = []
+
+        def send_then_fail(backend, messages):
+            calls.append(messages)
+            if len(calls) > 1:
+                raise Exception("SMTP is down")
+            return send_messages(backend, messages)
+
+        opens = [None, OSError("Connection refused")]
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', send_then_fail), \
+                patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=opens):
+            stats = deliver_notifications(workers=1)
+
+        self.assertEqual(stats, {'sent': 1, 'retried': 2, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        unsent = Notification.objects.exclude(status=Notification.SENT).order_by('id')
+        self.assertEqual(list(unsent.values_list('last_error', flat=True)), ["SMTP is down", "Connection refused"])
+
+    def test_deliver_notifications_reuses_connections(self):
+        customer = Customer.objects.first()
+        for _ in range(7):
+            Order.objects.create(robot_serial='X5LT', customer=customer)
+        for _ in range(7):
+            Robot.objects.create(serial='X5LT', model='X5', version='LT', created=timezone.now())
+        before = sender_stats()
+
+        with patch('robots.notifications.get_connection', wraps=get_connection) as mock_get_connection:
+            stats = deliver_notifications(workers=2)
+
+        after = sender_stats()
+        self.assertEqual(stats['sent'], 10)
+        self.assertEqual(mock_get_connection.call_count, 2)
+        self.assertEqual(after['connections'] - before['connections'], 2)
+        self.assertEqual(after['messages_sent'] - before['messages_sent'], 10)
+        self.assertEqual(len(mail.outbox), 10)
+
+    def test_fulfilment_renders_message_once_per_model_version(self):
+        with patch('robots.notifications.render_robot_available_email',
+                   wraps=render_robot_available_email) as mock_render:
+            Order.objects.update(is_waiting=True, is_fulfilled=False, robot=None)
+            Notification.objects.all().delete()
+            fulfil_waiting_orders(self.robots)
+
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertEqual(mock_render.call_count, 1)
+
+    def test_send_notifications_command(self):
+        out = io.StringIO()
+        call_command('send_notifications', stdout=out)
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn("Sent: 3", out.getvalue())
+
+
+class ProductionRollupTestCase(TestCase):
+
+    def setUp(self):
+        report_cache().clear()
+        add_to_catalogue(('R2', 'D2'), ('13', 'XS'))
+
+    def rollup(self):
+        return {
+            (row.day.isoformat(), row.model, row.version): row.count
+            for row in RobotDailyCount.objects.all()
+        }
+
+    def test_rollup_follows_single_and_bulk_creation(self):
+        Robot.objects.create(serial='R2D2', model='R2', version='D2',
+                             created=datetime.datetime(2024, 12, 12, 23, 59, tzinfo=datetime.timezone.utc))
+        data = [
+            {"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"},
+            {"model": "R2", "version": "D2", "created": "2024-12-13 00:00:00"},
+            {"model": "13", "version": "XS", "created": "2024-12-13 10:00:00"},
+        ]
+        self.client.post(reverse('create_robots_bulk'), data=json.dumps(data), content_type='application/json')
+
+        self.assertEqual(self.rollup(), {
+            ('2024-12-12', 'R2', 'D2'): 2,
+            ('2024-12-13', 'R2', 'D2'): 1,
+            ('2024-12-13', '13', 'XS'): 1,
+        })
+
+    def test_summary_is_served_from_rollup(self):
+        today = timezone.localdate()
+        RobotDailyCount.objects.create(day=today, model='R2', version='D2', count=40)
+        RobotDailyCount.objects.create(day=today - datetime.timedelta(days=6), model='R2', version='D2', count=2)
+        RobotDailyCount.objects.create(day=today - datetime.timedelta(days=7), model='R2', version='D2', count=100)
+
+        response = self.client.get(reverse('download_robots_summary'))
+
+        wb = load_workbook(io.BytesIO(response.content))
+        check_data_rows(wb['R2'], [('R2', 'D2', 42)])
+
+    def test_rebuild_robot_rollup_command(self):
+        created = datetime.datetime(2024, 12, 12, 10, tzinfo=datetime.timezone.utc)
+        Robot.objects.bulk_create([
+            Robot(serial='R2D2', model='R2', version='D2', created=created),
+            Robot(serial='R2D2', model='R2', version='D2', created=created),
+            Robot(serial='R2D2', model='R2', version='D2', created=created + datetime.timedelta(days=1)),
+        ])
+        RobotDailyCount.objects.create(day=datetime.date(2024, 12, 12), model='R2', version='D2', count=7)
+
+        out = io.StringIO()
+        call_command('rebuild_robot_rollup', '--from', '2024-12-12', '--to', '2024-12-12', stdout=out)
+
+        self.assertEqual(self.rollup(), {('2024-12-12', 'R2', 'D2'): 2})
+        self.assertIn("Rebuilt 1 rollup rows", out.getvalue())
+
+        call_command('rebuild_robot_rollup', stdout=out)
+        self.assertEqual(self.rollup(), {('2024-12-12', 'R2', 'D2'): 2, ('2024-12-13', 'R2', 'D2'): 1})
+
+
+class SummaryCacheTestCase(TestCase):
+
+    def setUp(self):
+        report_cache().clear()
+        self.url = reverse('download_robots_summary')
+        Robot.objects.create(serial='R2D2', model='R2', version='D2', created=timezone.now())
+
+    def test_summary_is_cached_until_new_production(self):
+        first = self.client.get(self.url)
+        # Only the data version is read.
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+        Robot.objects.create(serial='R2D2', model='R2', version='D2', created=timezone.now())
+        third = self.client.get(self.url)
+
+        self.assertNotEqual(first['ETag'], third['ETag'])
+        check_data_rows(load_workbook(io.BytesIO(third.content))['R2'], [('R2', 'D2', 2)])
+
+    def test_summary_sees_changes_from_other_processes(self):
+        first = self.client.get(self.url)
+
+        # Writers only touch the database, so a robot added by another process,
+        # with its own cache, invalidates this one just the same.
+        with patch('robots.report_cache.report_cache') as mock_report_cache:
+            Robot.objects.create(serial='R2D2', model='R2', version='D2', created=timezone.now())
+        mock_report_cache.assert_not_called()
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(second.status_code, 200)
+        check_data_rows(load_workbook(io.BytesIO(second.content))['R2'], [('R2', 'D2', 2)])
+
+        call_command('rebuild_robot_rollup', stdout=io.StringIO())
+        self.assertNotEqual(self.client.get(self.url)['ETag'], second['ETag'])
+
+    def test_summary_conditional_get(self):
+        response = self.client.get(self.url)
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_summary_variants_have_distinct_etags(self):
+        xlsx = self.client.get(self.url)
+        streamed = self.client.get(self.url, {'stream': '1'})
+
+        self.assertNotEqual(xlsx['ETag'], streamed['ETag'])
+        self.assertEqual(load_workbook(io.BytesIO(b''.join(streamed.streaming_content))).sheetnames, ['R2'])
+
+    @override_settings(ROBOTS_SUMMARY_CACHE_MAX_BYTES=100)
+    def test_summary_over_size_cap_is_not_cached(self):
+        self.client.get(self.url)
+        self.client.get(self.url, {'stream': '1'})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked against SQLite")
+class QueryPlanTestCase(TestCase):
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f"INDEX {index_name}", plan)
+
+    def test_created_range_uses_index(self):
+        self.assertUsesIndex(Robot.objects.filter(created__gte=timezone.now()), 'robot_created_idx')
+
+    def test_model_version_grouping_uses_index(self):
+        robots = Robot.objects.values_list('model', 'version').annotate(count=Count('id')).order_by('model', 'version')
+        self.assertUsesIndex(robots, 'robot_model_version_idx')
+
+    def test_serial_lookup_uses_index(self):
+        self.assertUsesIndex(Robot.objects.filter(serial='R2D2'), 'robot_serial_idx')
+
+
+class RobotCatalogueTestCase(TestCase):
+
+    def setUp(self):
+        add_to_catalogue(('R2', 'D2'))
+        self.url = reverse('create_robot')
+
+    def post_robot(self, model, version):
+        data = {"model": model, "version": version, "created": "2024-12-12 10:00:00"}
+        return self.client.post(self.url, data=json.dumps(data), content_type='application/json')
+
+    def test_create_robot_links_catalogue_version(self):
+        response = self.post_robot('R2', 'D2')
+
+        self.assertEqual(response.status_code, 201)
+        robot = Robot.objects.get(id=response.json()['id'])
+        self.assertEqual(robot.robot_version, RobotVersion.objects.get(model__code='R2', code='D2'))
+
+    def test_create_robot_rejects_unknown_model_and_version(self):
+        for model, version in (('R3', 'D2'), ('R2', 'D3')):
+            response = self.post_robot(model, version)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], 'Unknown robot model or version')
+        self.assertFalse(Robot.objects.exists())
+
+    @override_settings(ROBOTS_VALIDATE_CATALOGUE=False)
+    def test_catalogue_validation_can_be_disabled(self):
+        response = self.post_robot('R3', 'D2')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(Robot.objects.get().robot_version)
+
+    def test_validation_uses_cache_and_sees_catalogue_changes(self):
+        record = {"model": "R2", "version": "D3", "created": "2024-12-12 10:00:00"}
+        with self.assertRaises(RobotValidationError):
+            validate_robot_data(record)
+
+        add_to_catalogue(('R2', 'D3'))
+        with self.assertNumQueries(1):
+            validate_robot_data(record)
+        with self.assertNumQueries(0):
+            fields = validate_robot_data(record)
+
+        self.assertEqual(fields['robot_version_id'], RobotVersion.objects.get(code='D3').id)
+
+        RobotVersion.objects.filter(code='D3').delete()
+        with self.assertRaises(RobotValidationError):
+            validate_robot_data(record)
+
+
+class AsyncViewsTestCase(TestCase):
+
+    def setUp(self):
+        report_cache().clear()
+        add_to_catalogue(('R2', 'D2'))
 
-            mock_send_email.assert_called_once_with(order.customer, robot)
+    async def test_acreate_robot(self):
+        customer = await Customer.objects.acreate(email='customer@example.com')
+        order = await Order.objects.acreate(robot_serial='R2D2', customer=customer)
+        data = {"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}
+
+        response = await self.async_client.post(
+            reverse('acreate_robot'), data=json.dumps(data), content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        robot = await Robot.objects.aget(id=response.json()['id'])
+        self.assertEqual(robot.serial, 'R2D2')
+        await order.arefresh_from_db()
+        self.assertTrue(order.is_fulfilled)
+
+    async def test_acreate_robot_validation(self):
+        data = {"model": "R3", "version": "D2", "created": "2024-12-12 10:00:00"}
+        response = await self.async_client.post(
+            reverse('acreate_robot'), data=json.dumps(data), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Unknown robot model or version')
+
+        response = await self.async_client.get(reverse('acreate_robot'))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_agenerate_robot_summary_matches_sync_view(self):
+        await Robot.objects.acreate(serial='R2D2', model='R2', version='D2', created=timezone.now())
+
+        response = await self.async_client.get(reverse('adownload_robots_summary'))
+
+        self.assertEqual(response.status_code, 200)
+        wb = load_workbook(io.BytesIO(response.content))
+        check_data_rows(wb['R2'], [('R2', 'D2', 1)])
+
+        with patch('robots.views.render_report_async') as render:
+            cached = await self.async_client.get(reverse('adownload_robots_summary'))
+        render.assert_not_called()
+        self.assertEqual(cached.content, response.content)
+
+        response = await self.async_client.get(
+            reverse('adownload_robots_summary'), headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class CodecTestCase(TestCase):
+
+    def test_parse_created_fixed_format(self):
+        self.assertEqual(parse_created('2022-12-31 23:59:59'), datetime.datetime(2022, 12, 31, 23, 59, 59))
+        self.assertEqual(parse_created('2022-12-31T23:59:59'), datetime.datetime(2022, 12, 31, 23, 59, 59))
+
+    def test_parse_created_falls_back_to_parse_datetime(self):
+        self.assertEqual(
+            parse_created('2022-12-31T23:59:59.5+03:00'),
+            datetime.datetime(2022, 12, 31, 23, 59, 59, 500000,
+                              tzinfo=datetime.timezone(datetime.timedelta(hours=3)))
+        )
+        self.assertIsNone(parse_created('31.12.2022 23:59'))
+
+    def test_parse_created_rejects_invalid_values(self):
+        self.assertIsNone(parse_created('2022-12- 1 23:59:59'))
+        with self.assertRaises(ValueError):
+            parse_created('2022-13-31 23:59:59')
+
+    def test_json_response(self):
+        response = json_response({'error': 'Ошибка', 'id': 1}, status=400)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), {'error': 'Ошибка', 'id': 1})
+
+    def test_codec_round_trip(self):
+        data = {'model': 'R2', 'created': '2022-12-31 23:59:59', 'count': 3}
+
+        self.assertEqual(codec.loads(codec.dumps(data)), data)
+        with self.assertRaises(codec.DecodeError):
+            codec.loads(b'{model: R2}')
+
+
+class IdempotencyTestCase(TestCase):
+
+    def setUp(self):
+        recent_keys.clear()
+        self.addCleanup(recent_keys.clear)
+        add_to_catalogue(('R2', 'D2'))
+        self.data = {"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}
+
+    def post_robot(self, data, **headers):
+        return self.client.post(
+            reverse('create_robot'), data=json.dumps(data), content_type='application/json', headers=headers
+        )
+
+    def test_retry_returns_original_robot(self):
+        first = self.post_robot(self.data)
+        retry = self.post_robot(self.data)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json(), {'message': "Robot already created", 'id': first.json()['id']})
+        self.assertEqual(Robot.objects.count(), 1)
+        self.assertEqual(RobotDailyCount.objects.get().count, 1)
+
+    def test_idempotency_key_header(self):
+        first = self.post_robot(self.data, **{'Idempotency-Key': 'line-7:42'})
+        later = dict(self.data, created="2024-12-12 10:00:05")
+        retry = self.post_robot(later, **{'Idempotency-Key': 'line-7:42'})
+        other = self.post_robot(later)
+
+        self.assertEqual(retry.json()['id'], first.json()['id'])
+        self.assertEqual(other.status_code, 201)
+        self.assertEqual(Robot.objects.get(id=first.json()['id']).idempotency_key, 'line-7:42')
+
+        response = self.post_robot(self.data, **{'Idempotency-Key': 'x' * 101})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], "Invalid idempotency key")
+
+    def test_recent_keys_answer_retry_without_query(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            robot_id = self.post_robot(self.data).json()['id']
+
+        with self.assertNumQueries(0):
+            response = self.post_robot(self.data)
+
+        self.assertEqual(response.json()['id'], robot_id)
+
+    def test_bulk_skips_duplicates(self):
+        url = reverse('create_robots_bulk')
+        robot_id = self.post_robot(self.data).json()['id']
+        data = [self.data, dict(self.data, created="2024-12-12 11:00:00"), dict(self.data, created="2024-12-12 11:00:00")]
+        response = self.client.post(url, data=json.dumps(data), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['duplicates']), (1, 2))
+        self.assertEqual(body['results'][0], {'index': 0, 'id': robot_id, 'duplicate': True})
+        self.assertEqual(body['results'][2]['id'], body['results'][1]['id'])
+        self.assertEqual(Robot.objects.count(), 2)
+
+        response = self.client.post(url, data=json.dumps(data[:1]), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_stream_counts_duplicates(self):
+        self.post_robot(self.data)
+        response = self.client.post(
+            reverse('create_robots_stream'),
+            data=json.dumps(self.data) + '\n' + json.dumps(dict(self.data, created="2024-12-12 11:00:00")),
+            content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(response.json()['accepted'], 2)
+        self.assertEqual(response.json()['duplicates'], 1)
+        self.assertEqual(Robot.objects.count(), 2)
+
+
+class WaitingOrderIndexTestCase(TestCase):
+
+    def setUp(self):
+        waiting_orders.invalidate()
+        self.addCleanup(waiting_orders.invalidate)
+        self.customer = Customer.objects.create(email='customer@example.com')
+
+    def robot(self, serial):
+        return Robot.objects.bulk_create(
+            [Robot(serial=serial, model=serial[:2], version=serial[2:], created=timezone.now())]
+        )[0]
+
+    def test_serial_without_waiting_orders_skips_query(self):
+        Order.objects.create(robot_serial='R2D2', customer=self.customer)
+        waiting_orders.reload()
+        before = waiting_orders.stats()
+
+        robot = self.robot('X5LT')
+        with self.assertNumQueries(0):
+            self.assertEqual(fulfil_waiting_orders([robot]), [])
+        fulfil_waiting_orders([self.robot('R2D2')])
+
+        stats = waiting_orders.stats()
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+
+    def test_index_follows_order_signals_and_fulfilment(self):
+        waiting_orders.reload()
+        first = Order.objects.create(robot_serial='R2D2', customer=self.customer)
+        second = Order.objects.create(robot_serial='13XS', customer=self.customer)
+        self.assertEqual(waiting_orders.waiting_serials(['R2D2', '13XS']), ['R2D2', '13XS'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            fulfil_waiting_orders([self.robot('R2D2')])
+
+        self.assertEqual(waiting_orders.waiting_serials(['R2D2', '13XS']), [])
+        first.refresh_from_db()
+        self.assertTrue(first.is_fulfilled)
+
+    def test_removal_waits_for_commit(self):
+        order = Order.objects.create(robot_serial='R2D2', customer=self.customer)
+        waiting_orders.reload()
+
+        with self.captureOnCommitCallbacks(execute=False):
+            order.is_waiting = False
+            order.save()
+
+        self.assertEqual(waiting_orders.waiting_serials(['R2D2']), ['R2D2'])
+
+    @override_settings(ROBOTS_WAITING_INDEX_RESYNC_INTERVAL=0)
+    def test_resync_picks_up_orders_written_without_signals(self):
+        waiting_orders.reload()
+        Order.objects.bulk_create([Order(robot_serial='R2D2', customer=self.customer)])
+
+        self.assertEqual(waiting_orders.waiting_serials(['R2D2']), ['R2D2'])
+        self.assertGreaterEqual(waiting_orders.stats()['drift'], 1)
+
+    def test_resync_allocates_robots_stocked_for_orders_of_other_processes(self):
+        waiting_orders.reload()
+        # Placed by another process: this one's index does not know it.
+        order = Order.objects.bulk_create([Order(robot_serial='R2D2', customer=self.customer)])[0]
+        robot = self.robot('R2D2')
+        add_to_stock([robot])
+        self.assertEqual(fulfil_waiting_orders([robot]), [])
+
+        waiting_orders.invalidate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(fulfil_waiting_orders([self.robot('X5LT')]), [])
+
+        order.refresh_from_db()
+        self.assertEqual(order.robot, robot)
+        self.assertTrue(order.is_fulfilled)
+        self.assertEqual(current_stock(), {})
+        self.assertEqual(waiting_orders.waiting_serials(['R2D2']), [])
+
+    def test_repair_robot_stock_allocates_stocked_robots(self):
+        robot = self.robot('R2D2')
+        add_to_stock([robot])
+        waiting_orders.reload()
+        order = Order.objects.bulk_create([Order(robot_serial='R2D2', customer=self.customer)])[0]
+
+        out = io.StringIO()
+        call_command('repair_robot_stock', stdout=out)
+
+        self.assertIn("Fulfilled 1 waiting orders from stock", out.getvalue())
+        order.refresh_from_db()
+        self.assertEqual(order.robot, robot)
+
+
+class RobotStockTestCase(TestCase):
+
+    def setUp(self):
+        add_to_catalogue(('R2', 'D2'), ('13', 'XS'))
+        self.customer = Customer.objects.create(email='customer@example.com')
+
+    def create_robots(self, serial, count):
+        data = [
+            {"model": serial[:2], "version": serial[2:], "created": f"2024-12-12 10:00:{i:02}"} for i in range(count)
+        ]
+        self.client.post(reverse('create_robots_bulk'), data=json.dumps(data), content_type='application/json')
+
+    def test_stock_follows_production_and_orders(self):
+        Order.objects.create(robot_serial='R2D2', customer=self.customer)
+        self.create_robots('R2D2', 3)
+        self.create_robots('13XS', 1)
+        Robot.objects.create(serial='13XS', model='13', version='XS', created=timezone.now())
+        self.assertEqual(current_stock(), {'13XS': 2, 'R2D2': 2})
+
+        self.client.post(
+            reverse('create_order'),
+            data=json.dumps({'email': 'customer@example.com', 'robot_serial': '13XS'}),
+            content_type='application/json'
+        )
+        self.assertEqual(current_stock(), {'13XS': 1, 'R2D2': 2})
+
+    def test_robot_stock_view(self):
+        self.create_robots('R2D2', 2)
+        url = reverse('robot_stock')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.json(), {'stock': {'R2D2': 2}, 'total': 2})
+
+        response = self.client.get(url, {'serial': ['R2D2', '13XS']})
+        self.assertEqual(response.json(), {'stock': {'R2D2': 2, '13XS': 0}, 'total': 2})
+        self.assertEqual(self.client.post(url).status_code, 405)
+
+    def test_repair_robot_stock_command(self):
+        self.create_robots('R2D2', 2)
+        Robot.objects.bulk_create([Robot(serial='13XS', model='13', version='XS', created=timezone.now())])
+        RobotStock.objects.filter(serial='R2D2').update(count=5)
+        RobotStock.objects.create(serial='X5LT', count=1)
+
+        out = io.StringIO()
+        call_command('repair_robot_stock', stdout=out)
+
+        self.assertEqual(current_stock(), {'13XS': 1, 'R2D2': 2})
+        self.assertIn("R2D2: 5 -> 2", out.getvalue())
+        self.assertIn("Corrected 3 stock counters", out.getvalue())
+
+
+class SummaryQueryTestCase(TestCase):
+
+    def setUp(self):
+        report_cache().clear()
+        for model, version, created in [
+            ('R2', 'D2', '2024-12-02 10:00:00'),
+            ('R2', 'D2', '2024-12-03 23:30:00'),
+            ('R2', 'D2', '2024-12-10 10:00:00'),
+            ('X5', 'LT', '2024-11-30 12:00:00'),
+        ]:
+            Robot.objects.create(
+                serial=model + version, model=model, version=version,
+                created=timezone.make_aware(datetime.datetime.fromisoformat(created), datetime.timezone.utc)
+            )
+
+    def get_summary(self, **params):
+        return self.client.get(reverse('download_robots_summary'), params)
+
+    def summary_rows(self, **params):
+        with self.assertNumQueries(2):
+            response = self.get_summary(format='json', **params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return [(row['model'], row['version'], row.get('period'), row['count']) for row in response.json()['rows']]
+
+    def test_summary_by_day_week_and_month(self):
+        self.assertEqual(self.summary_rows(**{'from': '2024-12-01', 'to': '2024-12-10'}), [
+            ('R2', 'D2', None, 3),
+        ])
+        self.assertEqual(self.summary_rows(**{'from': '2024-12-01', 'to': '2024-12-10', 'granularity': 'day'}), [
+            ('R2', 'D2', '2024-12-02', 1), ('R2', 'D2', '2024-12-03', 1), ('R2', 'D2', '2024-12-10', 1),
+        ])
+        self.assertEqual(self.summary_rows(**{'from': '2024-12-01', 'to': '2024-12-10', 'granularity': 'week'}), [
+            ('R2', 'D2', '2024-12-02', 2), ('R2', 'D2', '2024-12-09', 1),
+        ])
+        self.assertEqual(self.summary_rows(**{'from': '2024-11-01', 'to': '2024-12-31', 'granularity': 'month'}), [
+            ('R2', 'D2', '2024-12-01', 3), ('X5', 'LT', '2024-11-01', 1),
+        ])
+
+    def test_summary_in_another_time_zone(self):
+        rows = self.summary_rows(**{'from': '2024-12-01', 'to': '2024-12-09', 'tz': 'Asia/Tokyo', 'granularity': 'day'})
+
+        self.assertEqual(rows, [('R2', 'D2', '2024-12-02', 1), ('R2', 'D2', '2024-12-04', 1)])
+
+    def test_summary_csv_and_workbook_by_period(self):
+        response = self.get_summary(**{'from': '2024-12-01', 'to': '2024-12-10', 'granularity': 'week', 'format': 'csv'})
+
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('robot_summary_2024-12-01_2024-12-10_by_week.csv', response['Content-Disposition'])
+        self.assertEqual(
+            response.content.decode().splitlines(),
+            ['model,version,period,count', 'R2,D2,2024-12-02,2', 'R2,D2,2024-12-09,1']
+        )
+
+        response = self.get_summary(**{'from': '2024-12-01', 'to': '2024-12-10', 'granularity': 'week'})
+        ws = load_workbook(io.BytesIO(response.content))['R2']
+        self.assertEqual([cell.value for cell in ws[1]], ['Модель', 'Версия', 'Период', 'Количество'])
+        self.assertEqual([cell.value for cell in ws[3]][-1], 1)
+
+    def test_summary_variants_are_cached_separately(self):
+        self.get_summary(format='json', **{'from': '2024-12-01', 'to': '2024-12-10'})
+        csv_etag = self.get_summary(format='csv', **{'from': '2024-12-01', 'to': '2024-12-10'})['ETag']
+        json_etag = self.get_summary(format='json', **{'from': '2024-12-01', 'to': '2024-12-10'})['ETag']
+
+        self.assertNotEqual(csv_etag, json_etag)
+        with self.assertNumQueries(1):
+            self.get_summary(format='json', **{'from': '2024-12-01', 'to': '2024-12-10'})
+
+    def test_summary_rejects_invalid_parameters(self):
+        for params, error in [
+            ({'from': 'yesterday'}, "Invalid date format"),
+            ({'from': '2024-12-10', 'to': '2024-12-01'}, "Invalid date range"),
+            ({'tz': 'Mars/Olympus'}, "Unknown time zone"),
+            ({'granularity': 'hour'}, "Unknown granularity"),
+            ({'format': 'pdf'}, "Unknown format"),
+            ({'to': '0001-01-03'}, "Date out of range"),
+            ({'from': '0001-01-01', 'to': '0001-01-03'}, "Date out of range"),
+            ({'to': '9999-12-31', 'tz': 'Asia/Tokyo'}, "Date out of range"),
+        ]:
+            response = self.get_summary(**params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], error)
+
+
+class RobotListingTestCase(TestCase):
+
+    def setUp(self):
+        start = datetime.datetime(2024, 12, 1, tzinfo=datetime.timezone.utc)
+        self.robots = Robot.objects.bulk_create([
+            Robot(
+                serial=f'R2D{i % 2}', model='R2', version=f'D{i % 2}',
+                # Two robots per timestamp, so that pages split ties on created.
+                created=start + datetime.timedelta(hours=i // 2)
+            )
+            for i in range(9)
+        ])
+
+    def test_robot_list_keyset_pages(self):
+        url = reverse('robot_list')
+        ids = []
+        cursor = None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            with self.assertNumQueries(1):
+                body = self.client.get(url, params).json()
+            ids.extend(robot['id'] for robot in body['results'])
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(ids, [robot.id for robot in self.robots])
+        self.assertEqual(self.client.get(url).json()['results'][0], {
+            'id': self.robots[0].id, 'serial': 'R2D0', 'model': 'R2', 'version': 'D0',
+            'created': '2024-12-01T00:00:00+00:00',
+        })
+
+    def test_robot_list_filters(self):
+        url = reverse('robot_list')
+        body = self.client.get(url, {
+            'version': 'D1', 'created_from': '2024-12-01T01:00:00', 'created_to': '2024-12-01T03:00:00'
+        }).json()
+
+        self.assertEqual([robot['id'] for robot in body['results']], [self.robots[3].id, self.robots[5].id])
+        self.assertIsNone(body['next_cursor'])
+
+        self.assertEqual(self.client.get(url, {'created_from': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).json()['error'], "Invalid cursor")
+        self.assertEqual(self.client.get(url, {'limit': '-1'}).json()['error'], "Invalid limit")
+
+    @skipUnless(connection.vendor == 'sqlite', "Query plans are checked against SQLite")
+    def test_keyset_page_uses_created_index(self):
+        robot = self.robots[4]
+        robots = after(filter_robots(QueryDict()), robot.created, robot.id)
+
+        self.assertIn("SEARCH robots_robot USING INDEX robot_created_idx", robots.explain())
+
+    def test_robot_export_csv_and_ndjson(self):
+        url = reverse('robot_export')
+
+        response = self.client.get(url, {'model': 'R2', 'version': 'D0'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,serial,model,version,created')
+        self.assertEqual(lines[1], f'{self.robots[0].id},R2D0,R2,D0,2024-12-01T00:00:00+00:00')
+        self.assertEqual(len(lines), 6)
+
+        response = self.client.get(url, {'format': 'ndjson'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([record['id'] for record in records], [robot.id for robot in self.robots])
+
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+
+
+class QueryScalingTestCase(TestCase):
+    """
+        Query counts and wall time of the hot paths, with 1, 100 and 10 000
+        robots and orders already in the database.
+
+        Every path must run the same number of queries at every size, so an
+        N+1 or a per-row lookup fails here instead of in production. The time
+        budgets are generous; they catch full scans and quadratic loops, not
+        small slowdowns.
+    """
+
+    SIZES = (1, 100, 10000)
+    PAIRS = [('R2', 'D2'), ('13', 'XS'), ('X5', 'LT'), ('C3', 'PO'), ('B1', 'B2')]
+
+    def check_scaling(self, seed, run, queries, budget):
+        """Seed each size in a transaction that is rolled back, then run the path under test."""
+        for size in self.SIZES:
+            with self.subTest(size=size), transaction.atomic():
+                report_cache().clear()
+                recent_keys.clear()
+                catalogue_cache.invalidate()
+                add_to_catalogue(*self.PAIRS)
+                seeded = seed(size)
+                # Warm the in-process caches, as in a running server.
+                catalogue_cache.versions()
+                waiting_orders.reload()
+
+                with self.assertNumQueries(queries):
+                    start = time.perf_counter()
+                    run(seeded)
+                    elapsed = time.perf_counter() - start
+                self.assertLess(elapsed, budget, f"{elapsed:.3f}s with {size} rows")
+
+                transaction.set_rollback(True)
+
+        waiting_orders.invalidate()
+        catalogue_cache.invalidate()
+
+    def seed_robots(self, size, pairs=None):
+        """`size` robots in stock, spread over the pairs and the last six days."""
+        pairs = pairs or self.PAIRS
+        now = timezone.now()
+        robots = Robot.objects.bulk_create([
+            Robot(serial=model + version, model=model, version=version,
+                  created=now - datetime.timedelta(minutes=i % (6 * 24 * 60)))
+            for i, (model, version) in ((i, pairs[i % len(pairs)]) for i in range(size))
+        ])
+        rebuild_rollup()
+        repair_stock()
+
+        return robots
+
+    def seed_waiting_orders(self, size, serial):
+        customers = Customer.objects.bulk_create(
+            [Customer(email=f'customer{i}@example.com') for i in range(min(size, 100))]
+        )
+        return Order.objects.bulk_create(
+            [Order(customer=customers[i % len(customers)], robot_serial=serial) for i in range(size)]
+        )
+
+    def test_create_robot(self):
+        def seed(size):
+            self.seed_robots(size)
+            self.seed_waiting_orders(size, 'R2D2')
+
+        def run(seeded):
+            data = {"model": "R2", "version": "D2", "created": timezone.now().isoformat()}
+            response = self.client.post(reverse('create_robot'), data=json.dumps(data),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+
+        # The insert, one rollup, data version and stock update, then the
+        # allocation as in test_fulfil_waiting_orders, plus savepoints.
+        self.check_scaling(seed, run, queries=19, budget=0.5)
+
+    def test_fulfil_waiting_orders(self):
+        def seed(size):
+            self.seed_waiting_orders(size, 'R2D2')
+            robots = Robot.objects.bulk_create(
+                [Robot(serial='R2D2', model='R2', version='D2', created=timezone.now()) for _ in range(3)]
+            )
+            add_to_stock(robots)
+            return robots
+
+        def run(robots):
+            self.assertTrue(fulfil_waiting_orders(robots))
+
+        # The free robots, the oldest orders, one bulk update, one stock update
+        # and one insert of notifications, plus savepoints.
+        self.check_scaling(seed, run, queries=9, budget=0.5)
+
+    def test_place_order(self):
+        def seed(size):
+            self.seed_robots(size)
+            self.seed_waiting_orders(size, 'X5LT')
+
+        def run(seeded):
+            data = {"email": "customer0@example.com", "robot_serial": "R2D2"}
+            response = self.client.post(reverse('create_order'), data=json.dumps(data),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+
+        # The customer, one free robot, the order insert and one stock update,
+        # plus savepoints.
+        self.check_scaling(seed, run, queries=8, budget=0.5)
+
+    def test_robot_summary(self):
+        def run(seeded):
+            # The rollup, per week and per day, and the robot table for another time zone.
+            for params in ({}, {'granularity': 'day'}, {'tz': 'Europe/Moscow', 'format': 'csv'}):
+                self.assertEqual(self.client.get(reverse('download_robots_summary'), params).status_code, 200)
+
+        # The data version and one aggregate per report.
+        self.check_scaling(self.seed_robots, run, queries=6, budget=1.0)
+
+    def test_robot_list_and_stock(self):
+        def run(robots):
+            middle = robots[len(robots) // 2]
+            cursor = encode_cursor(middle.created, middle.id)
+            self.assertEqual(self.client.get(reverse('robot_list'), {'cursor': cursor}).status_code, 200)
+            self.assertEqual(self.client.get(reverse('robot_stock')).status_code, 200)
+
+        # A page from the middle of the table, and the stock counters.
+        self.check_scaling(self.seed_robots, run, queries=2, budget=0.5)
+
+
+class ImportRobotsTestCase(TestCase):
+
+    def setUp(self):
+        add_to_catalogue(('R2', 'D2'), ('13', 'XS'))
+        recent_keys.clear()
+        waiting_orders.invalidate()
+        self.addCleanup(waiting_orders.invalidate)
+
+    def import_file(self, content, suffix, *args):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        out = io.StringIO()
+        call_command('import_robots', f.name, *args, stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_import_csv_fulfils_waiting_orders_once(self):
+        customer = Customer.objects.create(email='customer@example.com')
+        orders = [Order.objects.create(robot_serial='R2D2', customer=customer) for _ in range(2)]
+        content = (
+            "model,version,created\n"
+            "R2,D2,2024-12-10 10:00:00\n"
+            "R2,D2,2024-12-10 11:00:00\n"
+            "13,XS,2024-12-11 10:00:00\n"
+            "R2,D3,2024-12-11 11:00:00\n"
+            "R2,D2,2024-12-12 10:00:00\n"
+        )
+
+        with patch('robots.ingest.fulfil_waiting_orders', wraps=fulfil_waiting_orders) as fulfil:
+            output = self.import_file(content, '.csv', '--chunk-size', '2')
+
+        fulfil.assert_called_once()
+        self.assertIn("Line 5: Unknown robot model or version", output)
+        self.assertIn("Imported 4 robots (0 already present), rejected 1, fulfilled 2 orders", output)
+        robots = list(Robot.objects.filter(serial='R2D2').order_by('created'))
+        for order in orders:
             order.refresh_from_db()
-            self.assertFalse(order.is_fulfilled)
-            self.assertTrue(order.is_waiting)
+        self.assertEqual([order.robot for order in orders], robots[:2])
+        self.assertEqual(current_stock(), {'13XS': 1, 'R2D2': 1})
+        self.assertEqual(sum(RobotDailyCount.objects.values_list('count', flat=True)), 4)
+        self.assertIsNone(recent_keys.get(robots[0].idempotency_key))
+
+    def test_import_ndjson_skips_stored_robots(self):
+        record = {"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}
+        self.client.post(reverse('create_robots_bulk'), data=json.dumps([record]), content_type='application/json')
+        recent_keys.clear()
+        content = json.dumps(record) + "\n" + json.dumps({**record, "created": "2024-12-12 11:00:00"}) + "\n"
+
+        output = self.import_file(content, '.ndjson')
+
+        self.assertIn("Imported 2 robots (1 already present), rejected 0", output)
+        self.assertEqual(Robot.objects.count(), 2)
+        self.assertEqual(current_stock(), {'R2D2': 2})
+
+    def test_import_rejects_invalid_utf8(self):
+        with tempfile.NamedTemporaryFile('wb', suffix='.ndjson', delete=False) as f:
+            f.write(b'{"model": "R2", "version": "D2", "created": "2024-12-12 10:00:00"}\n{"model": "R2\xff"}\n')
+        self.addCleanup(os.remove, f.name)
+        out = io.StringIO()
+
+        call_command('import_robots', f.name, stdout=out, stderr=io.StringIO())
+
+        self.assertIn("Invalid JSON format", out.getvalue())
+        self.assertIn("Imported 0 robots (0 already present), rejected 1", out.getvalue())
+        self.assertFalse(Robot.objects.exists())
+
+    def test_failed_import_fulfils_orders_of_committed_chunks(self):
+        customer = Customer.objects.create(email='customer@example.com')
+        order = Order.objects.create(robot_serial='R2D2', customer=customer)
+        content = "model,version,created\nR2,D2,2024-12-10 10:00:00\n13,XS,2024-12-11 10:00:00\n"
+        insert_robots = ingest.insert_robots
+
+        def fail_second_chunk(robots, chunk_size):
+            if robots[0].serial == '13XS':
+                raise DatabaseError("disk I/O error")
+            return insert_robots(robots, chunk_size)
+
+        with patch('robots.ingest.insert_robots', side_effect=fail_second_chunk), \
+                self.assertRaisesMessage(CommandError, "lines up to 2 were imported and 1 orders fulfilled"):
+            self.import_file(content, '.csv', '--chunk-size', '1')
+
+        order.refresh_from_db()
+        self.assertTrue(order.is_fulfilled)
+        self.assertEqual(order.robot, Robot.objects.get())
+
+    def test_import_from_standard_input_leaves_it_open(self):
+        stdin = io.StringIO("model,version,created\nR2,D2,2024-12-10 10:00:00\n")
+        out = io.StringIO()
+
+        with patch('sys.stdin', stdin):
+            call_command('import_robots', '-', '--format', 'csv', stdout=out, stderr=io.StringIO())
+
+        self.assertIn("Imported 1 robots", out.getvalue())
+        self.assertFalse(stdin.closed)
@@ -4,5 +4,12 @@ from . import views
 
 urlpatterns = [
     path('create/', views.create_robot, name='create_robot'),
-    path('download_robots_summary/', views.generate_robot_summary, name='download_robots_summary')
+    path('create/bulk/', views.create_robots_bulk, name='create_robots_bulk'),
+    path('create/stream/', views.create_robots_stream, name='create_robots_stream'),
+    path('list/', views.robot_list, name='robot_list'),
+    path('export/', views.robot_export, name='robot_export'),
+    path('stock/', views.robot_stock, name='robot_stock'),
+    path('download_robots_summary/', views.generate_robot_summary, name='download_robots_summary'),
+    path('async/create/', views.acreate_robot, name='acreate_robot'),
+    path('async/download_robots_summary/', views.agenerate_robot_summary, name='adownload_robots_summary'),
 ]
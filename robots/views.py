@@ -1,15 +1,37 @@
-import json
-from django.http import JsonResponse
+from . import codec
+from .codec import json_response
 from django.views.decorators.csrf import csrf_exempt
-from django.utils.dateparse import parse_datetime
 from django.db import DatabaseError
-from .models import Robot
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from .ingest import (
+    RobotValidationError, validate_robot_data, is_valid_idempotency_key, create_robot_once,
+    iter_ndjson, bulk_create_robots, ingest_ndjson_stream
+)
+from .idempotency import recent_keys
 
 import datetime
-from django.http import HttpResponse
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
-from django.db.models import Count
+import io
+import zoneinfo
+from collections import namedtuple
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from .report_cache import (
+    data_version, adata_version, get_cached_report, aget_cached_report, cache_report, acache_report
+)
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
+from .reports import (
+    GRANULARITIES, summary_rows, summary_fields, summary_headers, group_by_model,
+    render_summary, render_summary_csv, render_summary_json
+)
+from .catalogue import catalogue_cache
+from .stock import current_stock
+from .listing import RobotQueryError, filter_robots, page_robots, export_robots
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
 
 
 # Create your views here.
@@ -24,85 +46,543 @@ def create_robot(req):
             with the specified model, version, and creation date. It expects
             a JSON payload with the required fields.
 
+            The request is idempotent: a robot is identified by the
+            "Idempotency-Key" header, the "idempotency_key" field of the payload
+            or, without either, its serial and creation date, and a retried
+            request returns the robot stored by the first one.
+
         Parameters:
         -----------
         req (HttpRequest): The HTTP request object containing the POST data.
 
         Returns:
         --------
-        JsonResponse: A JSON response indicating the result of the operation.
+        HttpResponse: A JSON response indicating the result of the operation.
                       - On success, returns a 201 status with a message and the robot ID.
+                      - For a retry, returns a 200 status with the ID of the existing robot.
                       - On failure, returns an appropriate error message and status code:
-                        - 400 for missing fields, invalid JSON, or invalid date format.
+                        - 400 for missing fields, invalid JSON, invalid date format,
+                          or an invalid idempotency key.
                         - 405 if the request method is not POST.
                         - 500 for database errors or unexpected exceptions.
     """
     if req.method == "POST":
         try:
-            data = json.loads(req.body)
-
-            model = data.get('model')
-            version = data.get('version')
-            created_str = data.get('created')
-
-            if not model or not version or not created_str:
-                return JsonResponse(
-                    {'error': "Missing required fields"},
-                    status=400
-                )
-
-            created = parse_datetime(created_str)
-            if not created:
-                return JsonResponse(
-                    {'error': "Invalid date format"},
-                    status=400
-                )
-
-            serial = f"{model}{version}"
-
-            robot = Robot.objects.create(
-                serial=serial,
-                model=model,
-                version=version,
-                created=created
-            )
+            data = codec.loads(req.body)
 
-            return JsonResponse(
-                {
-                    'message': "Robot created succesfully",
-                    "id": robot.id
-                },
-                status=201
-            )
+            try:
+                robot_fields = apply_idempotency_header(req, validate_robot_data(data))
+            except RobotValidationError as e:
+                return json_response({'error': str(e)}, status=400)
+
+            return robot_created_response(*create_robot_once(robot_fields))
 
-        except json.JSONDecodeError:
-            return JsonResponse({"error": "Invalid JSON format"}, status=400)
+        except codec.DecodeError:
+            return json_response({"error": "Invalid JSON format"}, status=400)
         except DatabaseError as e:
-            return JsonResponse(
+            return json_response(
                 {"error": f"Database error: {str(e)}"},
                 status=500
             )
         except Exception as e:
-            return JsonResponse(
+            return json_response(
                 {"error": f"Unexpected error: {str(e)}"},
                 status=500
             )
     else:
-        return JsonResponse(
+        return json_response(
+            {'error': "Only POST method is allowed"},
+            status=405
+        )
+
+
+def apply_idempotency_header(req, robot_fields):
+    """Let an "Idempotency-Key" request header override the key of the record."""
+    key = req.headers.get('Idempotency-Key')
+    if key is not None:
+        if not is_valid_idempotency_key(key):
+            raise RobotValidationError("Invalid idempotency key")
+        robot_fields['idempotency_key'] = key
+
+    return robot_fields
+
+
+def robot_created_response(robot_id, created):
+    if not created:
+        return json_response(
+            {
+                'message': "Robot already created",
+                "id": robot_id
+            },
+            status=200
+        )
+
+    return json_response(
+        {
+            'message': "Robot created succesfully",
+            "id": robot_id
+        },
+        status=201
+    )
+
+
+def batch_too_large(max_batch_size):
+    return json_response(
+        {'error': f"Batch size exceeds the limit of {max_batch_size} records"},
+        status=413
+    )
+
+
+@csrf_exempt
+def create_robots_bulk(req):
+    """
+        Description:
+        ------------
+            Handle the creation of a batch of robots in a single request.
+
+            The body is either a JSON array of robot objects or, with the
+            "application/x-ndjson" content type, one robot object per line.
+            Every record is validated with the same rules as create_robot, and
+            all valid records are written with chunked bulk_create inside one
+            transaction. Invalid records are reported and skipped, and records
+            whose idempotency key is already stored are not written again.
+
+        Parameters:
+        -----------
+        req (HttpRequest): The HTTP request object containing the batch.
+
+        Returns:
+        --------
+        HttpResponse: A JSON response with per-record results.
+                      - 201 when at least one robot was created, 400 when none were
+                        (200 when every valid record was a duplicate).
+                        "results" holds {"index", "id"} for created records,
+                        {"index", "id", "duplicate"} for already stored ones and
+                        {"index", "error"} for rejected ones (index is 0-based for
+                        JSON arrays and the 1-based line number for NDJSON).
+                      - 400 for a malformed body, 413 when the batch exceeds
+                        ROBOTS_BULK_MAX_BATCH_SIZE records.
+                      - 405 if the request method is not POST.
+                      - 500 for database errors; nothing is written in that case.
+    """
+    if req.method != "POST":
+        return json_response(
+            {'error': "Only POST method is allowed"},
+            status=405
+        )
+
+    max_batch_size = settings.ROBOTS_BULK_MAX_BATCH_SIZE
+
+    try:
+        if req.content_type == 'application/x-ndjson':
+            records = []
+            for line_number, record, error in iter_ndjson(req):
+                if len(records) >= max_batch_size:
+                    return batch_too_large(max_batch_size)
+                records.append((line_number, record, error))
+        else:
+            data = codec.loads(req.body)
+            if not isinstance(data, list):
+                return json_response({'error': "Expected a JSON array"}, status=400)
+            if len(data) > max_batch_size:
+                return batch_too_large(max_batch_size)
+            records = [(index, record, None) for index, record in enumerate(data)]
+    except RequestDataTooBig:
+        return batch_too_large(max_batch_size)
+    except (codec.DecodeError, UnicodeDecodeError):
+        return json_response({"error": "Invalid JSON format"}, status=400)
+
+    results = []
+    valid_fields = []
+    valid_results = []
+    for index, record, error in records:
+        if error is None:
+            try:
+                valid_fields.append(validate_robot_data(record))
+            except RobotValidationError as e:
+                error = str(e)
+
+        if error is None:
+            result = {'index': index}
+            valid_results.append(result)
+        else:
+            result = {'index': index, 'error': error}
+        results.append(result)
+
+    try:
+        robots = bulk_create_robots(valid_fields)
+    except DatabaseError as e:
+        return json_response(
+            {"error": f"Database error: {str(e)}"},
+            status=500
+        )
+
+    created = 0
+    for result, (robot_id, robot_created) in zip(valid_results, robots):
+        result['id'] = robot_id
+        if robot_created:
+            created += 1
+        else:
+            result['duplicate'] = True
+
+    if created:
+        status = 201
+    elif robots:
+        status = 200
+    else:
+        status = 400
+
+    return json_response(
+        {
+            'created': created,
+            'duplicates': len(robots) - created,
+            'rejected': len(results) - len(robots),
+            'results': results
+        },
+        status=status
+    )
+
+
+@csrf_exempt
+def create_robots_stream(req):
+    """
+        Description:
+        ------------
+            Ingest an NDJSON upload of robots as a stream.
+
+            Unlike create_robots_bulk, the body is never read into memory as a
+            whole: lines are parsed as they arrive and robots are flushed to the
+            database in chunks of ROBOTS_STREAM_CHUNK_SIZE, each in its own
+            transaction. Bad lines are reported by line number and skipped, so a
+            client only needs to resend the lines that were rejected.
+
+        Parameters:
+        -----------
+        req (HttpRequest): The HTTP request object with an NDJSON body.
+
+        Returns:
+        --------
+        HttpResponse: A JSON response with "accepted", "duplicates", "rejected", "errors"
+                      ({"line", "error"}, at most ROBOTS_STREAM_MAX_ERRORS of them),
+                      "errors_truncated" and "last_committed_line".
+                      - 200 once the whole stream has been processed.
+                      - 405 if the request method is not POST.
+                      - 500 for database errors; chunks up to "last_committed_line"
+                        are stored and the rest of the stream should be resent.
+    """
+    if req.method != "POST":
+        return json_response(
             {'error': "Only POST method is allowed"},
             status=405
         )
 
+    report = ingest_ndjson_stream(req)
+
+    return json_response(report, status=500 if 'error' in report else 200)
+
+
+def robot_stock(req):
+    """
+        Description:
+        ------------
+            Report the robots currently in stock per serial.
+
+            Counts come from the maintained stock counters, so the cost is one
+            small query however many robots and orders there are. Repeat the
+            "serial" query parameter to restrict the report to some serials.
+
+        Parameters:
+        -----------
+        req (HttpRequest): The HTTP request object.
+
+        Returns:
+        --------
+        HttpResponse: A JSON response with "stock", a {serial: count} mapping of
+                      the serials in stock, and "total".
+                      - 405 if the request method is not GET.
+    """
+    if req.method != "GET":
+        return json_response(
+            {'error': "Only GET method is allowed"},
+            status=405
+        )
+
+    stock = current_stock()
+    serials = req.GET.getlist('serial')
+    if serials:
+        stock = {serial: stock.get(serial, 0) for serial in serials}
+
+    return json_response({'stock': stock, 'total': sum(stock.values())})
+
+
+SUMMARY_FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+# The days a summary can cover: a day of margin keeps the bounds of the range
+# valid datetimes in any time zone.
+SUMMARY_MIN_DAY = datetime.date.min + datetime.timedelta(days=1)
+SUMMARY_MAX_DAY = datetime.date.max - datetime.timedelta(days=1)
+
+SummaryQuery = namedtuple('SummaryQuery', ['start', 'end', 'tz', 'granularity', 'format', 'write_only'])
+
+
+class SummaryQueryError(ValueError):
+    """Raised for summary query parameters that cannot be honoured."""
+
+
+def robot_list(req):
+    """
+        Description:
+        ------------
+            List robots, oldest first, a page at a time.
+
+            Robots can be filtered by "model", "version", "created_from" and
+            "created_to" (see filter_robots). Pages are keyset-paginated on
+            (created, id): pass the "next_cursor" of a page as "cursor" to get the
+            next one, and "limit" to change the page size.
+
+        Parameters:
+        -----------
+        req (HttpRequest): The HTTP request object.
+
+        Returns:
+        --------
+        HttpResponse: A JSON response with "results", a list of {"id", "serial",
+                      "model", "version", "created"}, and "next_cursor", null on
+                      the last page.
+                      - 400 for invalid filters, limit or cursor.
+                      - 405 if the request method is not GET.
+    """
+    if req.method != "GET":
+        return json_response(
+            {'error': "Only GET method is allowed"},
+            status=405
+        )
+
+    try:
+        limit = int(req.GET.get('limit') or 0)
+        if limit < 0:
+            raise ValueError
+    except ValueError:
+        return json_response({'error': "Invalid limit"}, status=400)
+
+    try:
+        rows, next_cursor = page_robots(filter_robots(req.GET), req.GET.get('cursor'), limit)
+    except RobotQueryError as e:
+        return json_response({'error': str(e)}, status=400)
+
+    for row in rows:
+        row['created'] = row['created'].isoformat()
+
+    return json_response({'results': rows, 'next_cursor': next_cursor})
+
+
+def robot_export(req):
+    """
+        Description:
+        ------------
+            Export every robot matching the filters of robot_list as a stream.
+
+            "format" is "csv" (the default) or "ndjson". The response is streamed
+            while the table is read in chunks, so exporting the whole table takes
+            constant memory.
+
+        Parameters:
+        -----------
+        req (HttpRequest): The HTTP request object.
+
+        Returns:
+        --------
+        StreamingHttpResponse: The export as an attachment.
+        HttpResponse: 400 for invalid filters or format, 405 if the request method is not GET.
+    """
+    if req.method != "GET":
+        return json_response(
+            {'error': "Only GET method is allowed"},
+            status=405
+        )
+
+    export_format = req.GET.get('format', 'csv')
+    content_types = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+    if export_format not in content_types:
+        return json_response({'error': "Unknown format"}, status=400)
+
+    try:
+        robots = filter_robots(req.GET)
+    except RobotQueryError as e:
+        return json_response({'error': str(e)}, status=400)
+
+    response = StreamingHttpResponse(export_robots(robots, export_format), content_type=content_types[export_format])
+    response['Content-Disposition'] = f'attachment; filename=robots.{export_format}'
+
+    return response
+
+
+def summary_query(req):
+    """
+        Description:
+        ------------
+            The summary a request asks for, from its query parameters.
+
+            "from" and "to" are the first and last day (YYYY-MM-DD) in the time
+            zone "tz" (an IANA name, TIME_ZONE by default); the range defaults to
+            the seven days ending today. "granularity" is "total" (the default),
+            "day", "week" or "month"; "format" is "xlsx" (the default), "csv" or
+            "json". "stream=1", or ROBOTS_SUMMARY_WRITE_ONLY, streams a workbook
+            built from write-only sheets.
+
+        Parameters:
+        -----------
+            req (HttpRequest): The HTTP request object.
+
+        Returns:
+        --------
+            SummaryQuery: The parsed parameters.
+
+        Raises:
+        -------
+            SummaryQueryError: With the message that is returned to the client.
+    """
+    params = req.GET
+
+    tz = timezone.get_default_timezone()
+    if params.get('tz'):
+        try:
+            tz = zoneinfo.ZoneInfo(params['tz'])
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            raise SummaryQueryError("Unknown time zone")
+
+    days = {}
+    for param in ('from', 'to'):
+        try:
+            days[param] = parse_date(params[param]) if params.get(param) else None
+        except ValueError:
+            days[param] = None
+        if params.get(param) and days[param] is None:
+            raise SummaryQueryError("Invalid date format")
+
+    end = days['to'] or timezone.localdate(timezone=tz)
+    try:
+        start = days['from'] or end - datetime.timedelta(days=6)
+    except OverflowError:
+        raise SummaryQueryError("Date out of range")
+    if start > end:
+        raise SummaryQueryError("Invalid date range")
+    if start < SUMMARY_MIN_DAY or end > SUMMARY_MAX_DAY:
+        raise SummaryQueryError("Date out of range")
+
+    granularity = params.get('granularity', 'total')
+    if granularity not in GRANULARITIES:
+        raise SummaryQueryError("Unknown granularity")
+
+    report_format = params.get('format', 'xlsx')
+    if report_format not in SUMMARY_FORMATS:
+        raise SummaryQueryError("Unknown format")
+
+    write_only = params.get('stream') == '1' or settings.ROBOTS_SUMMARY_WRITE_ONLY
+
+    return SummaryQuery(start, end, tz, granularity, report_format, write_only)
+
+
+def summary_variant(query):
+    """The parts of the cache key and ETag that tell summaries apart."""
+    variant = 'stream' if query.format == 'xlsx' and query.write_only else query.format
+    return (query.start, query.end, query.tz.key, query.granularity, variant)
+
+
+def with_data_version(view):
+    """
+        Read the production data version once per request, into req.data_version,
+        before the conditional request checks that need it; async views read it
+        with the async ORM.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def inner(req, *args, **kwargs):
+            req.data_version = await adata_version()
+            return await view(req, *args, **kwargs)
+    else:
+        @wraps(view)
+        def inner(req, *args, **kwargs):
+            req.data_version = data_version()
+            return view(req, *args, **kwargs)
+
+    return inner
+
+
+def summary_etag(req, *args, **kwargs):
+    try:
+        query = summary_query(req)
+    except SummaryQueryError:
+        return None
+    return '-'.join(map(str, [req.data_version.tag, *summary_variant(query)]))
+
+
+def summary_last_modified(req, *args, **kwargs):
+    try:
+        query = summary_query(req)
+    except SummaryQueryError:
+        return None
+    # The default window moves at midnight even when no robot was produced.
+    start_of_today = datetime.datetime.combine(
+        timezone.localdate(timezone=query.tz), datetime.time(), tzinfo=query.tz
+    )
+    return max(req.data_version.changed_at, start_of_today)
+
+
+def render_report(rows, query):
+    """
+        Render summary_rows in the requested format: a spooled workbook file for
+        xlsx, bytes for csv and json.
+    """
+    if query.format == 'csv':
+        return render_summary_csv(rows, query.granularity)
+    if query.format == 'json':
+        return render_summary_json(
+            rows,
+            **{'from': query.start.isoformat(), 'to': query.end.isoformat()},
+            tz=query.tz.key,
+            granularity=query.granularity,
+        )
+
+    fields = summary_fields(query.granularity)
+    summary = group_by_model([tuple(row[field] for field in fields) for row in rows])
+    return render_summary(
+        summary,
+        write_only=query.write_only,
+        headers=summary_headers(query.granularity, query.start, query.end),
+    )
+
 
+@with_data_version
+@condition(etag_func=summary_etag, last_modified_func=summary_last_modified)
 def generate_robot_summary(req):
     """
         Description:
         ------------
-            Generate an Excel summary of robots created in the last week.
+            Generate a summary of the robots produced in a range of days.
+
+            By default this is the Excel summary of the last week: the daily
+            production rollup summed over the past seven days, today included,
+            per model and version with a single aggregate query, so the cost does
+            not depend on the number of robots, in a workbook with one sheet per
+            model. Query parameters (see summary_query) select another range, time
+            zone and a breakdown by day, week or month, all computed by the
+            database in one aggregate query, and CSV or JSON output, which
+            dashboards can poll without paying for workbook generation.
+
+            With ?stream=1 (or ROBOTS_SUMMARY_WRITE_ONLY enabled) the workbook is
+            built from write-only worksheets, saved into a spooled temporary file
+            and streamed to the client, which keeps peak memory bounded for
+            summaries with hundreds of sheets.
 
-            This function retrieves all robots created in the past week and generates
-            an Excel file summarizing the count of each model and version. The Excel
-            file is then returned as an HTTP response for download.
+            Generated files are cached by query and production data version, which
+            advances whenever robots are created, so repeated downloads are served
+            from the cache. Responses carry ETag and Last-Modified, and conditional
+            requests get 304 Not Modified while the data is unchanged.
 
         Parameters:
         -----------
@@ -111,46 +591,170 @@ def generate_robot_summary(req):
         Returns:
         -------
             HttpResponse:
-            An HTTP response with the Excel file attached, containing the summary of robots created in the last week.
+            An HTTP response with the summary file attached, by default the Excel summary of the last week.
+            FileResponse: The same file, streamed, in write-only mode.
+            HttpResponse: A 400 JSON error for invalid query parameters.
     """
-    one_week_ago = datetime.datetime.now() - datetime.timedelta(days=7)
-    robots = Robot.objects.filter(created__gte=one_week_ago)
+    try:
+        query = summary_query(req)
+    except SummaryQueryError as e:
+        return json_response({'error': str(e)}, status=400)
 
-    wb = Workbook()
-    wb.create_sheet(title="Placeholder")
-    wb.remove(wb["Placeholder"])
+    version = req.data_version.tag
+    variant = summary_variant(query)
 
-    models = robots.values('model').distinct()
+    report = get_cached_report(version, *variant)
+    if report is None:
+        rows = summary_rows(query.start, query.end, query.tz, query.granularity)
+        report = cacheable_summary(render_report(list(rows), query))
+        if isinstance(report, bytes):
+            cache_report(report, version, *variant)
 
-    for model in models:
-        model_name = model['model']
-        model_robots = robots.filter(model=model_name)
+    return summary_response(report, query)
 
-        version_summary = model_robots.values('version').annotate(count=Count('id'))
-        ws = wb.create_sheet(title=model_name)
 
-        ws.append(['Модель', 'Версия', 'Количество за неделю'])
+def cacheable_summary(report):
+    """
+        The bytes of a rendered summary, to be cached, or the summary file
+        itself, rewound, when it is larger than ROBOTS_SUMMARY_CACHE_MAX_BYTES.
+    """
+    if isinstance(report, bytes):
+        return report
 
-        for entry in version_summary:
-            ws.append([model_name, entry['version'], entry['count']])
+    size = report.seek(0, io.SEEK_END)
+    report.seek(0)
+    if size > settings.ROBOTS_SUMMARY_CACHE_MAX_BYTES:
+        return report
 
-        for col in range(1, 4):
-            column = get_column_letter(col)
-            max_length = 0
+    with report:
+        return report.read()
 
-            for row in ws.iter_rows(min_col=col, max_col=col):
-                for cell in row:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-            adjusted_width = (max_length + 2)
-            ws.column_dimensions[column].width = adjusted_width
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename=robot_summary_last_week.xlsx'
+def summary_response(report, query):
+    """The download response for summary bytes, or a summary file that is too large to cache."""
+    if query.end == timezone.localdate(timezone=query.tz) and query.end - query.start == datetime.timedelta(days=6):
+        name = 'robot_summary_last_week'
+    else:
+        name = f'robot_summary_{query.start}_{query.end}'
+    if query.granularity != 'total':
+        name = f'{name}_by_{query.granularity}'
+    filename = f'{name}.{query.format}'
+    content_type = SUMMARY_FORMATS[query.format]
 
-    wb.save(response)
+    if isinstance(report, bytes) and not (query.format == 'xlsx' and query.write_only):
+        response = HttpResponse(report, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename={filename}'
+    else:
+        if isinstance(report, bytes):
+            report = io.BytesIO(report)
+        response = FileResponse(report, as_attachment=True, filename=filename, content_type=content_type)
+    patch_cache_control(response, no_cache=True)
 
     return response
+
+
+# Workbooks rendered for async views are built on this bounded pool, so that
+# a burst of downloads cannot occupy an unbounded number of threads.
+report_executor = ThreadPoolExecutor(
+    max_workers=settings.ROBOTS_REPORT_WORKERS,
+    thread_name_prefix='robots-report'
+)
+render_report_async = sync_to_async(render_report, thread_sensitive=False, executor=report_executor)
+
+
+@csrf_exempt
+async def acreate_robot(req):
+    """
+        Description:
+        ------------
+            Asynchronous version of create_robot for ASGI deployments.
+
+            The robot is validated exactly like in create_robot. A retry whose
+            key is among the recent keys is answered without leaving the event
+            loop; otherwise the robot is stored by create_robot_once in a worker
+            thread, since recovering from a duplicate key needs a transaction,
+            which the async ORM does not provide. Responses are the same as
+            those of create_robot.
+
+        Parameters:
+        -----------
+        req (HttpRequest): The HTTP request object containing the POST data.
+
+        Returns:
+        --------
+        HttpResponse: See create_robot.
+    """
+    if req.method != "POST":
+        return json_response(
+            {'error': "Only POST method is allowed"},
+            status=405
+        )
+
+    try:
+        data = codec.loads(req.body)
+
+        try:
+            robot_fields = apply_idempotency_header(
+                req, validate_robot_data(data, await catalogue_cache.aversions())
+            )
+        except RobotValidationError as e:
+            return json_response({'error': str(e)}, status=400)
+
+        robot_id = recent_keys.get(robot_fields['idempotency_key'])
+        if robot_id is not None:
+            return robot_created_response(robot_id, False)
+
+        return robot_created_response(*await sync_to_async(create_robot_once)(robot_fields))
+
+    except codec.DecodeError:
+        return json_response({"error": "Invalid JSON format"}, status=400)
+    except DatabaseError as e:
+        return json_response(
+            {"error": f"Database error: {str(e)}"},
+            status=500
+        )
+    except Exception as e:
+        return json_response(
+            {"error": f"Unexpected error: {str(e)}"},
+            status=500
+        )
+
+
+@with_data_version
+@condition(etag_func=summary_etag, last_modified_func=summary_last_modified)
+async def agenerate_robot_summary(req):
+    """
+        Description:
+        ------------
+            Asynchronous version of generate_robot_summary for ASGI deployments.
+
+            The summary rows are read with the async ORM and the report, which is
+            CPU-bound, is rendered on the bounded report_executor thread pool
+            (ROBOTS_REPORT_WORKERS threads). Query parameters, caching,
+            conditional requests and the ?stream=1 mode behave as in
+            generate_robot_summary.
+
+        Parameters:
+        -----------
+            req (HttpRequest): The HTTP request object.
+
+        Returns:
+        -------
+            HttpResponse: See generate_robot_summary.
+    """
+    try:
+        query = summary_query(req)
+    except SummaryQueryError as e:
+        return json_response({'error': str(e)}, status=400)
+
+    version = req.data_version.tag
+    variant = summary_variant(query)
+
+    report = await aget_cached_report(version, *variant)
+    if report is None:
+        rows = [row async for row in summary_rows(query.start, query.end, query.tz, query.granularity).aiterator()]
+        report = cacheable_summary(await render_report_async(rows, query))
+        if isinstance(report, bytes):
+            await acache_report(report, version, *variant)
+
+    return summary_response(report, query)
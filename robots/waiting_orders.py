@@ -0,0 +1,125 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from orders.models import Order
+
+
+class WaitingOrderIndex:
+    """
+        In-process index of the waiting list: robot serial -> ids of the orders waiting for it.
+
+        Most new robots have no waiting orders, and the index lets fulfilment
+        skip the Order query for them. It is loaded with one query on first use
+        and kept in sync by the Order signals and by fulfilment itself. Orders
+        written by other processes, or with update()/bulk_create(), are picked up
+        by a resync once the index is older than ROBOTS_WAITING_INDEX_RESYNC_INTERVAL
+        seconds.
+
+        The index may hold serials that no longer wait, which only costs a
+        query, but must never miss one that does: orders are added as soon as
+        they are saved and only removed once the transaction that took them off
+        the waiting list has committed. Orders it misses until a resync, those
+        of other processes, are matched against the robots in stock when the
+        resync happens (robots.fulfilment.match_stock_to_waiting_orders).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._loaded_at = None
+        self._reloading = False
+        self._added_during_reload = []
+        self._stats = {'hits': 0, 'misses': 0, 'resyncs': 0, 'drift': 0}
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def is_fresh(self):
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < settings.ROBOTS_WAITING_INDEX_RESYNC_INTERVAL
+        )
+
+    def reload(self):
+        """Load the waiting list from the database, counting the serials the index had wrong."""
+        with self._lock:
+            self._reloading = True
+            self._added_during_reload = []
+        try:
+            orders = {}
+            for order_id, serial in Order.objects.filter(is_waiting=True).values_list('id', 'robot_serial'):
+                orders.setdefault(serial, set()).add(order_id)
+        finally:
+            with self._lock:
+                self._reloading = False
+                added, self._added_during_reload = self._added_during_reload, []
+
+        with self._lock:
+            # Orders saved while the query ran may be missing from its result.
+            for order_id, serial in added:
+                orders.setdefault(serial, set()).add(order_id)
+            if self._loaded_at is not None:
+                self._stats['resyncs'] += 1
+                self._stats['drift'] += len(set(orders).symmetric_difference(self._orders))
+            self._orders = orders
+            self._loaded_at = time.monotonic()
+
+        return orders
+
+    def add(self, order_id, serial):
+        with self._lock:
+            if self._reloading:
+                self._added_during_reload.append((order_id, serial))
+            self._orders.setdefault(serial, set()).add(order_id)
+
+    def discard(self, order_id, serial):
+        with self._lock:
+            order_ids = self._orders.get(serial)
+            if order_ids is not None:
+                order_ids.discard(order_id)
+                if not order_ids:
+                    del self._orders[serial]
+
+    def discard_on_commit(self, orders):
+        """Remove (order id, serial) pairs once the current transaction commits."""
+        orders = list(orders)
+        if orders:
+            transaction.on_commit(lambda: [self.discard(order_id, serial) for order_id, serial in orders])
+
+    def waiting_serials(self, serials):
+        """The given serials that may have waiting orders, in order; the rest need no query."""
+        if not self.is_fresh():
+            self.reload()
+
+        waiting = [serial for serial in serials if serial in self._orders]
+        with self._lock:
+            self._stats['hits'] += len(waiting)
+            self._stats['misses'] += len(serials) - len(waiting)
+
+        return waiting
+
+    def waiting_counts(self):
+        """The number of waiting orders per serial, as {serial: count}."""
+        if not self.is_fresh():
+            self.reload()
+
+        with self._lock:
+            return {serial: len(order_ids) for serial, order_ids in self._orders.items()}
+
+    def stats(self):
+        """
+            Counters of the index: "hits" are serials that had waiting orders to
+            look up, "misses" serials whose query was skipped, "resyncs" periodic
+            reloads and "drift" the serials those reloads found out of date.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['serials'] = len(self._orders)
+        return stats
+
+
+waiting_orders = WaitingOrderIndex()